@@ -0,0 +1,54 @@
+"""
+animation.py: Animation clips read from a shared clock.
+A Clip is a list of frames that each last a fixed number of ticks, so the
+frame shown at any tick follows from the tick alone. Sprites that animate in
+lockstep (apples, platforms) reference a clip instead of keeping their own
+counter and index, and their world's AnimationClock counts the ticks they
+have been animated for; the world sets the new frame on a whole group only
+when the clip moves on to it, just before drawing.
+"""
+
+
+#ticks a frame is held for after the one it is shown on, as in the sprites' own counters
+ANIMATION_COOLDOWN = 5
+
+
+class Clip():
+    def __init__(self, frames, cooldown=ANIMATION_COOLDOWN) -> None:
+        self.frames = frames
+        self.period = cooldown + 1
+
+    def __len__(self):
+        return len(self.frames)
+
+    def index_at(self, ticks):
+        return ticks // self.period % len(self.frames)
+
+    def frame_at(self, ticks):
+        return self.frames[self.index_at(ticks)]
+
+
+class AnimationClock():
+    def __init__(self) -> None:
+        self.ticks = 0
+        #group -> (clip, index of the frame its sprites were last given)
+        self.shown = {}
+
+    def advance(self):
+        self.ticks += 1
+
+    def reset(self):
+        self.ticks = 0
+        self.shown.clear()
+
+    def animate(self, group, clip):
+        #give every sprite in the group the clip's current frame, if it is not already showing it
+        index = clip.index_at(self.ticks)
+        last = self.shown.get(group)
+        if last is not None and last[0] is clip and last[1] == index:
+            return False
+        self.shown[group] = (clip, index)
+        frame = clip.frames[index]
+        for sprite in group:
+            sprite.image = frame
+        return True
@@ -0,0 +1,146 @@
+"""
+assets.py: Process-wide cache for images and sprite sheet frames.
+Every sheet is loaded, converted and sliced once (including its x-flipped
+variant), and the resulting frame lists are shared by every sprite that asks
+for them, so level loads and restarts do not decode the same PNGs again.
+With the atlas enabled, frames are subsurfaces of a few shared atlas pages
+instead of one small surface each. bundle.py can fill the cache from a
+precompiled bundle instead of decoding and slicing the sheets. Animation
+clips over the frame lists are shared the same way.
+"""
+
+import threading
+import pygame
+import spritesheet
+from animation import Clip, ANIMATION_COOLDOWN
+
+
+black = (0, 0, 0)
+
+
+class AssetCache():
+    def __init__(self) -> None:
+        self.images = {}
+        self.frames = {}
+        self.clips = {}
+        self.hits = 0
+        self.misses = 0
+        self.atlas = None
+        #buffers that loaded surfaces share their pixels with, such as an asset bundle's mapping
+        self.buffers = []
+        #the cache is safe to share between threads, though the level loader only parses files off the main thread
+        self.lock = threading.RLock()
+
+    def enable_atlas(self, page_size=512):
+        #only frames sliced from now on go into the atlas
+        with self.lock:
+            if self.atlas is None:
+                self.atlas = spritesheet.TextureAtlas(page_size)
+        return self.atlas
+
+    def _convert(self, image, alpha):
+        #conversion needs a display surface, so skip it when running without one
+        if pygame.display.get_surface() is None:
+            return image
+        if alpha:
+            return image.convert_alpha()
+        return image.convert()
+
+    def get_image(self, filename, size=None, alpha=True):
+        with self.lock:
+            return self._get_image(filename, size, alpha)
+
+    def _get_image(self, filename, size, alpha):
+        key = (filename, size, alpha)
+        if key in self.images:
+            self.hits += 1
+            return self.images[key]
+        self.misses += 1
+        if size is None:
+            image = self._convert(pygame.image.load(filename), alpha)
+        else:
+            image = pygame.transform.scale(self._get_image(filename, None, alpha), size)
+        self.images[key] = image
+        return image
+
+    def get_frames(self, filename, animation_steps, width, height, scale=1, color=black, flipped=False):
+        with self.lock:
+            return self._get_frames(filename, animation_steps, width, height, scale, color, flipped)
+
+    def _get_frames(self, filename, animation_steps, width, height, scale, color, flipped):
+        key = (filename, animation_steps, width, height, scale, color, flipped)
+        if key in self.frames:
+            self.hits += 1
+            return self.frames[key]
+        self.misses += 1
+        if flipped:
+            frames = [spritesheet.SpriteSheet.get_x_flipped_image(img, color, self.atlas)
+                      for img in self._get_frames(filename, animation_steps, width, height, scale, color, False)]
+        else:
+            sprite_sheet = spritesheet.SpriteSheet(self._get_image(filename, None, True))
+            frames = [sprite_sheet.get_image(step_counter, width, height, scale, color, self.atlas)
+                      for step_counter in range(animation_steps)]
+        self.frames[key] = frames
+        return frames
+
+    def get_clip(self, filename, animation_steps, width, height, scale=1, color=black, cooldown=ANIMATION_COOLDOWN):
+        #one clip per frame list and frame length, so sprites showing the same animation share it
+        with self.lock:
+            key = (filename, animation_steps, width, height, scale, color, cooldown)
+            clip = self.clips.get(key)
+            if clip is None:
+                clip = Clip(self._get_frames(filename, animation_steps, width, height, scale, color, False), cooldown)
+                self.clips[key] = clip
+            return clip
+
+    def add(self, images, frames, pages=(), atlas_stats=None, buffer=None):
+        #take already loaded images and frame lists, with the atlas pages the frames were cut from
+        with self.lock:
+            self.images.update(images)
+            self.frames.update(frames)
+            if pages and self.atlas is not None:
+                self.atlas.adopt(pages, *(atlas_stats or (0, 0)))
+            if buffer is not None:
+                self.buffers.append(buffer)
+
+    def surfaces(self):
+        #every distinct surface holding pixels for the cache, atlas frames are counted through their pages
+        unique = {}
+        for image in self.images.values():
+            unique[id(image)] = image
+        for frames in self.frames.values():
+            for image in frames:
+                if image.get_parent() is None:
+                    unique[id(image)] = image
+        if self.atlas is not None:
+            for page in self.atlas.pages:
+                unique[id(page)] = page
+        return list(unique.values())
+
+    def resident_bytes(self):
+        return sum(image.get_pitch() * image.get_height() for image in self.surfaces())
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self.images),
+            'frame_lists': len(self.frames),
+            'resident_bytes': self.resident_bytes(),
+            'atlas': self.atlas.stats() if self.atlas is not None else None,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.frames.clear()
+            self.clips.clear()
+            self.buffers.clear()
+            if self.atlas is not None:
+                self.atlas = spritesheet.TextureAtlas(self.atlas.page_size)
+            self.hits = 0
+            self.misses = 0
+
+
+#shared cache used by every entity in the game
+cache = AssetCache()
@@ -0,0 +1,118 @@
+"""
+audio.py: Lazy sound effects and music over a fixed channel pool.
+AudioManager only starts the mixer when something is first played, decodes
+each effect the first time it is needed (or all at once with preload()), and
+keeps the decoded Sound for every later play. Music is streamed from its
+file by pygame.mixer.music. Effects play on a fixed pool of channels: when
+every channel is busy, a new sound takes over the channel of the lowest
+priority, oldest voice that is not more important than it, or is dropped.
+A disabled manager (or one whose mixer fails to start) does nothing, for
+headless runs and machines without an audio device.
+"""
+
+from collections import namedtuple
+import pygame
+
+
+#priority decides which voices a sound may steal, volume is set once when it is decoded
+Effect = namedtuple('Effect', ['filename', 'volume', 'priority'])
+
+
+class AudioManager():
+    def __init__(self, enabled=True, channels=8, frequency=44100, size=-16, stereo=2, buffer=512) -> None:
+        self.enabled = enabled
+        self.pool_size = channels
+        self.settings = (frequency, size, stereo, buffer)
+        self.ready = False
+        self.effects = {}
+        self.sounds = {}
+        #(priority, play order) of the voice last started on each channel
+        self.voices = [(0, 0)] * channels
+        self.channels = []
+        self.plays = 0
+        self.stolen = 0
+        self.dropped = 0
+        self.music = None
+
+    def start(self):
+        #start the mixer on first use, and fall back to silence if there is no audio device
+        if self.ready or not self.enabled:
+            return self.ready
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(*self.settings)
+            pygame.mixer.set_num_channels(self.pool_size)
+        except pygame.error:
+            self.enabled = False
+            return False
+        self.channels = [pygame.mixer.Channel(index) for index in range(self.pool_size)]
+        self.ready = True
+        return True
+
+    def register(self, name, filename, volume=1.0, priority=0):
+        self.effects[name] = Effect(filename, volume, priority)
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is None and self.start():
+            effect = self.effects[name]
+            sound = pygame.mixer.Sound(effect.filename)
+            sound.set_volume(effect.volume)
+            self.sounds[name] = sound
+        return sound
+
+    def preload(self):
+        #decode every registered effect now rather than on its first play
+        for name in self.effects:
+            self.sound(name)
+
+    def channel_for(self, priority):
+        #a free channel, else the busy one playing the least important, oldest voice no more important than this one
+        victim = None
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index, False
+            if self.voices[index][0] <= priority and (victim is None or self.voices[index] < self.voices[victim]):
+                victim = index
+        return victim, True
+
+    def play(self, name):
+        sound = self.sound(name)
+        if sound is None:
+            return None
+        priority = self.effects[name].priority
+        index, busy = self.channel_for(priority)
+        if index is None:
+            self.dropped += 1
+            return None
+        if busy:
+            self.stolen += 1
+        self.plays += 1
+        self.voices[index] = (priority, self.plays)
+        channel = self.channels[index]
+        channel.play(sound)
+        return channel
+
+    def play_music(self, filename, loops=-1):
+        #streamed from the file as it plays, not decoded up front
+        if not self.start():
+            return
+        pygame.mixer.music.load(filename)
+        pygame.mixer.music.play(loops, 0.0, 0)
+        self.music = filename
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'decoded': len(self.sounds),
+            'registered': len(self.effects),
+            'plays': self.plays,
+            'stolen': self.stolen,
+            'dropped': self.dropped,
+        }
+
+    def summary(self):
+        if not self.enabled:
+            return 'audio: off'
+        return (f'audio: {self.plays} plays, {self.stolen} voices stolen, {self.dropped} dropped, '
+                f'{len(self.sounds)} of {len(self.effects)} effects decoded')
@@ -0,0 +1,592 @@
+#!/usr/bin/env python
+
+"""
+benchmark.py: Performance benchmarks for the platformer.
+Runs under the SDL dummy video and audio drivers. The levels suite replays
+scripted input across every level file and generated maps of increasing size
+and entity density, timing each phase of a frame (update, collision, draw,
+flip); the micro suite compares individual optimizations. Run from the
+repository root, e.g.
+
+    python Platformer/benchmark.py --suite levels --json bench.json
+"""
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+from random import Random
+import pygame
+import bundle
+from animation import AnimationClock, Clip
+from assets import cache
+from collision import TileGrid
+from render import DirtyRenderer, FrameStats
+from loader import LevelLoader
+from pool import pool
+from text import GlyphAtlas, TextCache
+from simulation import Simulation, World, Inputs, load_level_data, NO_INPUT, STARTING_LEVEL, MAX_LEVEL
+
+
+tile_size = 32
+
+
+def make_tiles(cols, rows, density=0.3, seed=0):
+    #random solid tiles with a solid border, like the hand-made levels
+    rng = Random(seed)
+    tile_list = []
+    tile_grid = TileGrid(cols, rows, tile_size)
+    for row in range(rows):
+        for col in range(cols):
+            border = row in (0, rows - 1) or col in (0, cols - 1)
+            if border or rng.random() < density:
+                tile = (None, pygame.Rect(col * tile_size, row * tile_size, tile_size, tile_size))
+                tile_list.append(tile)
+                tile_grid.add(col, row, tile)
+    return tile_list, tile_grid
+
+
+def resolve_tiles(tiles, rect, dx, dy, vel_y):
+    #same checks Player.update runs against each candidate tile
+    for tile in tiles:
+        if tile[1].colliderect(rect.x + dx, rect.y, rect.width, rect.height):
+            dx = 0
+        if tile[1].colliderect(rect.x, rect.y + dy, rect.width, rect.height):
+            if vel_y < 0:
+                dy = tile[1].bottom - rect.top
+                vel_y = 0
+            elif vel_y >= 0:
+                dy = tile[1].top - rect.bottom
+    return dx, dy
+
+
+def bench_collision(sizes=(30, 60, 120, 240), frames=2000, seed=0):
+    #per-frame cost of the player's tile collision, scanning every tile vs querying the grid
+    results = []
+    for size in sizes:
+        tile_list, tile_grid = make_tiles(size, size, seed=seed)
+        rng = Random(seed)
+        moves = [(pygame.Rect(rng.randrange(size * tile_size), rng.randrange(size * tile_size), 20, 26),
+                  rng.choice((-5, 0, 5)), rng.randint(-15, 10)) for _ in range(frames)]
+
+        start = time.perf_counter()
+        for rect, dx, dy in moves:
+            resolve_tiles(tile_list, rect, dx, dy, dy)
+        linear = (time.perf_counter() - start) / frames
+
+        start = time.perf_counter()
+        for rect, dx, dy in moves:
+            resolve_tiles(tile_grid.query_sweep(rect, dx, dy), rect, dx, dy, dy)
+        grid = (time.perf_counter() - start) / frames
+
+        results.append({'size': size, 'tiles': len(tile_list), 'linear_us': linear * 1e6, 'grid_us': grid * 1e6})
+    return results
+
+
+def make_level(cols, rows, enemies=0, platforms=0, apples=0, spikes=0, seed=0):
+    #generated level grid with a solid border, floors every few rows and entities scattered above them
+    rng = Random(seed)
+    data = [[0] * cols for _ in range(rows)]
+    for col in range(cols):
+        data[0][col] = 1
+        data[rows - 1][col] = 2
+    for row in range(rows):
+        data[row][0] = 1
+        data[row][cols - 1] = 1
+    for row in range(5, rows - 1, 5):
+        for col in range(1, cols - 1):
+            if rng.random() < 0.8:
+                data[row][col] = 2
+    free = [(row, col) for row in range(1, rows - 1) for col in range(1, cols - 1)
+            if data[row][col] == 0 and (row, col) != (rows - 3, 3)]
+    rng.shuffle(free)
+    for tile, count in ((3, enemies), (4, platforms), (7, apples), (6, spikes)):
+        for _ in range(count):
+            if free:
+                row, col = free.pop()
+                data[row][col] = tile
+    return data
+
+
+def bench_entities(counts=(10, 100, 500, 1000), ticks=300, seed=0):
+    #per-tick cost of updating enemies and platforms as sprites vs as numpy arrays
+    results = []
+    for count in counts:
+        data = make_level(60, 60, enemies=count, platforms=count // 5, seed=seed)
+        result = {'enemies': count}
+        for mode in (False, True):
+            sim = Simulation(1, entity_arrays=mode, seed=seed)
+            sim.load_level(1, data)
+            world = sim.world
+            start = time.perf_counter()
+            for _ in range(ticks):
+                if world.entities is not None:
+                    world.entities.update()
+                else:
+                    world.enemy_group.update(world.idle_schedule)
+                    world.platform_group.update()
+            result['arrays_us' if mode else 'sprites_us'] = (time.perf_counter() - start) / ticks * 1e6
+        results.append(result)
+    return results
+
+
+def bench_contacts(counts=(10, 100, 500, 1000), queries=2000, seed=0):
+    #the player's enemy, spikes, exit and apple checks: one spritecollide per group vs one broad-phase query
+    results = []
+    for count in counts:
+        data = make_level(60, 60, enemies=count // 10, apples=count, spikes=count, seed=seed)
+        sim = Simulation(1, seed=seed)
+        sim.load_level(1, data)
+        world = sim.world
+        player = sim.player
+        rng = Random(seed)
+        spots = [(rng.randrange(60 * tile_size), rng.randrange(60 * tile_size)) for _ in range(queries)]
+
+        start = time.perf_counter()
+        for spot in spots:
+            player.rect.topleft = spot
+            pygame.sprite.spritecollide(player, world.apple_group, False)
+            any(enemy.rect.colliderect(player.rect) for enemy in world.enemy_group)
+            pygame.sprite.spritecollide(player, world.spikes_group, False)
+            pygame.sprite.spritecollide(player, world.exit_group, False)
+        linear = (time.perf_counter() - start) / queries
+
+        start = time.perf_counter()
+        for spot in spots:
+            player.rect.topleft = spot
+            world.contacts(player.rect)
+        grid = (time.perf_counter() - start) / queries
+
+        results.append({'spikes_apples': count, 'linear_us': linear * 1e6, 'grid_us': grid * 1e6})
+    return results
+
+
+def bench_transitions(ticks_per_level=60, seed=0):
+    #latency of swapping to the next level at the exit, loading it then vs prefetching it while playing
+    pygame.display.set_mode((960, 960))
+
+    def bake_level(level, world):
+        background = pygame.Surface((960, 960)).convert()
+        world.bake(background)
+
+    results = {}
+    for prefetch in (False, True):
+        loader = LevelLoader(load_level_data, World, bake_level) if prefetch else None
+        sim = Simulation(1, loader=loader, seed=seed)
+        stats = FrameStats('prefetched' if prefetch else 'loaded at exit', unit='transitions')
+        while sim.level < MAX_LEVEL:
+            for _ in range(ticks_per_level):
+                sim.step(NO_INPUT)
+                #leave the worker some time, as the frame cap would
+                time.sleep(0.001)
+            stats.begin()
+            sim.next_level()
+            if sim.world.static_layer is None:
+                bake_level(sim.level, sim.world)
+            stats.end()
+        if loader is not None:
+            loader.shutdown()
+        results['prefetch' if prefetch else 'sync'] = stats
+    return results
+
+
+class BenchSprite(pygame.sprite.DirtySprite):
+    def __init__(self, image, x, y, moving) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        self.image = image
+        self.rect = image.get_rect(topleft=(x, y))
+        self.moving = moving
+        self.move_direction = 1
+        self.move_counter = 0
+        self.dirty = 2 if moving else 1
+
+    def update(self):
+        if self.moving:
+            self.rect.x += self.move_direction
+            self.move_counter += 1
+            if abs(self.move_counter) > 50:
+                self.move_direction *= -1
+                self.move_counter *= -1
+
+
+class CountedSprite(pygame.sprite.Sprite):
+    #a sprite stepping through its frames with its own counter, as apples did before the animation clock
+    def __init__(self, frames) -> None:
+        pygame.sprite.Sprite.__init__(self)
+        self.frames = frames
+        self.index = 0
+        self.counter = 0
+        self.image = frames[0]
+
+    def update(self):
+        animation_cooldown = 5
+        self.counter += 1
+        if self.counter > animation_cooldown:
+            self.counter = 0
+            self.index += 1
+            if self.index >= len(self.frames):
+                self.index = 0
+            self.image = self.frames[self.index]
+
+
+def bench_animation(counts=(10, 100, 1000), ticks=600):
+    #animating a group in step: a counter per sprite updated every tick vs one clip on a shared clock
+    frames = [pygame.Surface((tile_size, tile_size)) for _ in range(17)]
+    clip = Clip(frames)
+    results = []
+    for count in counts:
+        group = pygame.sprite.Group([CountedSprite(frames) for _ in range(count)])
+        start = time.perf_counter()
+        for _ in range(ticks):
+            group.update()
+        counters = (time.perf_counter() - start) / ticks
+
+        clock = AnimationClock()
+        start = time.perf_counter()
+        for _ in range(ticks):
+            clock.advance()
+            clock.animate(group, clip)
+        clips = (time.perf_counter() - start) / ticks
+        results.append({'sprites': count, 'counters_us': counters * 1e6, 'clock_us': clips * 1e6})
+    return results
+
+
+def bench_render(counts=(10, 50, 200), frames=300, seed=0):
+    #frame time of redrawing the whole screen vs updating only dirty rects
+    screen = pygame.display.set_mode((960, 960))
+    background = pygame.Surface(screen.get_size()).convert()
+    background.fill((40, 90, 160))
+    image = pygame.Surface((tile_size, tile_size)).convert()
+    image.fill((200, 60, 60))
+    results = []
+    for count in counts:
+        rng = Random(seed)
+        group = pygame.sprite.Group()
+        for i in range(count):
+            group.add(BenchSprite(image, rng.randrange(64, 896), rng.randrange(64, 896), i % 2 == 0))
+
+        full = FrameStats('full redraw')
+        for _ in range(frames):
+            full.begin()
+            group.update()
+            screen.blit(background, (0, 0))
+            group.draw(screen)
+            pygame.display.update()
+            full.end()
+
+        renderer = DirtyRenderer(screen)
+        renderer.active = True
+        renderer.set_scene(background, group)
+        dirty = FrameStats('dirty rects')
+        for _ in range(frames):
+            dirty.begin()
+            group.update()
+            renderer.update(renderer.draw())
+            dirty.end()
+
+        results.append({'sprites': count, 'full': full, 'dirty': dirty})
+    return results
+
+
+def bench_text(frames=600):
+    #HUD text per frame: rendering the strings every frame, the text cache, and the score from a glyph atlas
+    screen = pygame.display.set_mode((960, 960))
+    font = pygame.font.SysFont('Bauhaus 93', 30)
+    white = (255, 255, 255)
+    text_cache = TextCache()
+    glyphs = GlyphAtlas(font, white, 'X 0123456789')
+
+    def rendered(text, x):
+        screen.blit(font.render(text, True, white), (x, 0))
+
+    def cached(text, x):
+        screen.blit(text_cache.render(font, text, white), (x, 0))
+
+    def run(draw_score, draw_level):
+        start = time.perf_counter()
+        for frame in range(frames):
+            #the score changes every 20 frames, about as often as apples are picked up in a busy level
+            draw_score('X ' + str(frame // 20), 27)
+            draw_level('Level 1', 448)
+        return (time.perf_counter() - start) / frames * 1e6
+
+    return {
+        'render_us': run(rendered, rendered),
+        'cached_us': run(cached, cached),
+        'glyphs_us': run(lambda text, x: glyphs.draw(screen, text, x, 0), cached),
+    }
+
+
+def bench_assets(runs=5):
+    #time to fill the asset cache with everything the game draws, decoding and slicing the PNGs vs installing a bundle
+    pygame.display.set_mode((960, 960))
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'assets.bundle')
+        size = bundle.build(cache, filename)
+        decode = install = float('inf')
+        for _ in range(runs):
+            cache.clear()
+            start = time.perf_counter()
+            bundle.warm(cache)
+            decode = min(decode, time.perf_counter() - start)
+            cache.clear()
+            start = time.perf_counter()
+            bundle.install(cache, filename)
+            install = min(install, time.perf_counter() - start)
+        cache.clear()
+    return {'bundle_bytes': size, 'decode_ms': decode * 1000, 'install_ms': install * 1000}
+
+
+def bench_restarts(runs=20, seed=0):
+    #restarting a level: building its world with new sprites vs respawning it in place from the sprite pool
+    data = make_level(60, 60, enemies=100, apples=100, platforms=50, spikes=50, seed=seed)
+    sim = Simulation(1, seed=seed)
+    sim.load_level(1, data)
+
+    def created():
+        return sum(counts['created'] for counts in pool.stats().values())
+
+    #worlds are kept until the end, so each one has to make its own sprites
+    worlds = []
+    build = respawn = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        worlds.append(World(data))
+        build = min(build, time.perf_counter() - start)
+    before = created()
+    for _ in range(runs):
+        start = time.perf_counter()
+        sim.load_level(1, data)
+        respawn = min(respawn, time.perf_counter() - start)
+    made = created() - before
+    for world in worlds:
+        world.release()
+    return {'sprites': len(sim.world.sprites), 'build_ms': build * 1000, 'respawn_ms': respawn * 1000, 'created': made / runs}
+
+PHASES = ['update', 'collision', 'draw', 'flip']
+
+#(size, share of cells holding enemies, apples, platforms, spikes) of the generated maps
+GENERATED_MAPS = [
+    (30, 0.01), (30, 0.05),
+    (60, 0.01), (60, 0.05),
+    (120, 0.01), (120, 0.05),
+]
+
+
+def scripted_inputs(tick):
+    #run right, pause, run right, run left and stand, jumping regularly
+    phase = (tick // 40) % 6
+    return Inputs(left=phase == 4, right=phase in (0, 1, 3), jump=tick % 50 < 10)
+
+
+def percentiles(times):
+    #summary of a list of durations in seconds, reported in milliseconds
+    if not times:
+        return {}
+    ordered = sorted(times)
+
+    def pick(pct):
+        return ordered[min(int(math.ceil(len(ordered) * pct / 100)) - 1, len(ordered) - 1)] * 1000
+
+    return {
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+class LevelRunner():
+    def __init__(self, screen, entity_arrays=False) -> None:
+        self.screen = screen
+        self.entity_arrays = entity_arrays
+        self.font = pygame.font.Font(None, 30)
+        self.background = pygame.Surface(screen.get_size()).convert()
+        tile = pygame.image.load('img/Pixel Adventure/Background/Blue.png').convert()
+        for y in range(0, self.background.get_height(), tile.get_height()):
+            for x in range(0, self.background.get_width(), tile.get_width()):
+                self.background.blit(tile, (x, y))
+
+    def load(self, sim, level, data):
+        sim.load_level(level, data)
+        sim.world.bake(self.background)
+
+    def draw(self, sim):
+        sim.world.sync_sprites()
+        sim.world.draw(self.screen)
+        self.screen.blit(self.font.render('X ' + str(sim.score), True, (255, 255, 255)), (27, 0))
+        for group in sim.world.sprite_groups():
+            group.draw(self.screen)
+        sim.player.draw(self.screen)
+
+    def run(self, name, data, ticks, seed):
+        #replay the scripted input for a number of ticks, restarting the level on death or exit
+        sim = Simulation(STARTING_LEVEL, entity_arrays=self.entity_arrays, seed=seed)
+        self.load(sim, STARTING_LEVEL, data)
+        times = {phase: [] for phase in PHASES}
+        frames = []
+        restarts = 0
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        for tick in range(ticks):
+            events = []
+            t0 = perf_counter()
+            sim.update_entities(events)
+            t1 = perf_counter()
+            sim.update_player(scripted_inputs(tick), events)
+            t2 = perf_counter()
+            self.draw(sim)
+            t3 = perf_counter()
+            pygame.display.update()
+            t4 = perf_counter()
+            times['update'].append(t1 - t0)
+            times['collision'].append(t2 - t1)
+            times['draw'].append(t3 - t2)
+            times['flip'].append(t4 - t3)
+            frames.append(t4 - t0)
+            if sim.game_over != 0:
+                restarts += 1
+                self.load(sim, STARTING_LEVEL, data)
+        elapsed = perf_counter() - start
+        sim_time = sum(times['update']) + sum(times['collision'])
+        return {
+            'name': name,
+            'cols': len(data[0]),
+            'rows': len(data),
+            'enemies': len(sim.world.enemy_group),
+            'platforms': len(sim.world.platform_group),
+            'apples': len(sim.world.apple_group),
+            'spikes': len(sim.world.spikes_group),
+            'ticks': ticks,
+            'restarts': restarts,
+            'frames_per_second': ticks / elapsed,
+            'sim_ticks_per_second': ticks / sim_time if sim_time else 0.0,
+            'frame': percentiles(frames),
+            'phases': {phase: percentiles(times[phase]) for phase in PHASES},
+        }
+
+
+def bench_levels(ticks=1200, seed=0, entity_arrays=False, generated=True):
+    screen = pygame.display.set_mode((960, 960))
+    runner = LevelRunner(screen, entity_arrays)
+    results = []
+    for level in range(STARTING_LEVEL, MAX_LEVEL + 1):
+        results.append(runner.run(f'level{level}', load_level_data(level), ticks, seed))
+    if generated:
+        for size, density in GENERATED_MAPS:
+            count = int(size * size * density)
+            data = make_level(size, size, enemies=count, apples=count, platforms=count // 2, spikes=count // 2, seed=seed)
+            results.append(runner.run(f'gen{size}x{size}@{density:g}', data, ticks, seed))
+    return results
+
+
+def print_levels(results):
+    print(f'{"map":<16} {"ents":>5} {"fps":>8} {"ticks/s":>9}  ' +
+          '  '.join(f'{phase + " p50/p95/p99 ms":>26}' for phase in PHASES))
+    for result in results:
+        entities = result['enemies'] + result['platforms'] + result['apples'] + result['spikes']
+        phases = '  '.join(f'{p["p50_ms"]:>8.3f} {p["p95_ms"]:>8.3f} {p["p99_ms"]:>8.3f}'
+                           for p in (result['phases'][phase] for phase in PHASES))
+        print(f'{result["name"]:<16} {entities:>5} {result["frames_per_second"]:>8.0f} '
+              f'{result["sim_ticks_per_second"]:>9.0f}  {phases}')
+
+
+def print_micro():
+    print('tile collision per frame')
+    print(f'{"level":>9} {"tiles":>7} {"linear us":>10} {"grid us":>8}')
+    for result in bench_collision():
+        size = result['size']
+        print(f'{size:>4}x{size:<4} {result["tiles"]:>7} {result["linear_us"]:>10.1f} {result["grid_us"]:>8.2f}')
+
+    print()
+    print('player overlap checks per tick')
+    print(f'{"spikes/apples":>14} {"groups us":>10} {"grid us":>8}')
+    for result in bench_contacts():
+        print(f'{result["spikes_apples"]:>14} {result["linear_us"]:>10.1f} {result["grid_us"]:>8.2f}')
+
+    print()
+    print('frame time by renderer')
+    for result in bench_render():
+        print(f'{result["sprites"]:>4} sprites  {result["full"].summary()}')
+        print(f'{"":>13} {result["dirty"].summary()}')
+
+    print()
+    print('lockstep animation per tick')
+    print(f'{"sprites":>8} {"counters us":>12} {"clock us":>9}')
+    for result in bench_animation():
+        print(f'{result["sprites"]:>8} {result["counters_us"]:>12.1f} {result["clock_us"]:>9.2f}')
+
+    print()
+    print('level transition latency')
+    for stats in bench_transitions().values():
+        print(f'  {stats.summary()}')
+
+    print()
+    print('HUD text per frame')
+    result = bench_text()
+    print(f'  font.render {result["render_us"]:.1f} us, text cache {result["cached_us"]:.1f} us, glyph atlas {result["glyphs_us"]:.1f} us')
+
+    print()
+    print('asset loading at startup')
+    result = bench_assets()
+    print(f'  decoding PNGs {result["decode_ms"]:.1f} ms, asset bundle {result["install_ms"]:.1f} ms ({result["bundle_bytes"] / 1024:.0f} KiB)')
+
+    print()
+    print('level restart')
+    result = bench_restarts()
+    print(f'  {result["sprites"]} sprites: new world {result["build_ms"]:.2f} ms, respawn in place {result["respawn_ms"]:.2f} ms '
+          f'({result["created"]:.1f} sprites created per restart)')
+
+    print()
+    print('enemy and platform update per tick')
+    print(f'{"enemies":>8} {"sprites us":>11} {"arrays us":>10}')
+    for result in bench_entities():
+        print(f'{result["enemies"]:>8} {result["sprites_us"]:>11.1f} {result["arrays_us"]:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Platformer performance benchmarks')
+    parser.add_argument('--suite', choices=['levels', 'micro', 'all'], default='levels')
+    parser.add_argument('--ticks', type=int, default=1200, help='ticks replayed per map')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--entity-arrays', action='store_true', help='update enemies and platforms as numpy arrays')
+    parser.add_argument('--atlas', action='store_true', help='slice animation frames into shared atlas pages')
+    parser.add_argument('--no-generated', action='store_true', help='only run the level files')
+    parser.add_argument('--json', help='write the levels suite results to this file')
+    args = parser.parse_args()
+    pygame.init()
+    if args.atlas:
+        cache.enable_atlas(384)
+
+    if args.suite in ('levels', 'all'):
+        results = bench_levels(args.ticks, args.seed, args.entity_arrays, not args.no_generated)
+        print_levels(results)
+        if args.json:
+            report = {
+                'python': sys.version.split()[0],
+                'pygame': pygame.version.ver,
+                'platform': platform.platform(),
+                'ticks': args.ticks,
+                'seed': args.seed,
+                'entity_arrays': args.entity_arrays,
+                'atlas': args.atlas,
+                'results': results,
+            }
+            with open(args.json, 'w') as out:
+                json.dump(report, out, indent=2)
+    if args.suite in ('micro', 'all'):
+        if args.suite == 'all':
+            print()
+        print_micro()
+
+
+if __name__ == '__main__':
+    main()
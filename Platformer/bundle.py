@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+"""
+bundle.py: Precompiled asset bundle for a fast cold start.
+Building the bundle loads every image the game draws through the asset cache
+(backgrounds, buttons, tiles, and the sliced and flipped frames of every
+entity) and writes their pixels out raw, in the display's pixel format:
+
+    header  '<4sHHII'  magic b'PAST', version, atlas page size, index length, data offset
+    index   JSON: pixel format, SHA-1 of every source file, the surfaces'
+            sizes and offsets, and the cache keys of the images and frame
+            lists with the surface and rect each one comes from
+    data    raw pixel buffers, each starting on a 64 byte boundary
+
+install() memory-maps the bundle and hands the cache surfaces made with
+pygame.image.frombuffer over the mapping, so nothing is decoded, sliced or
+flipped at startup. A bundle is stale when any source file's hash, the
+atlas page size or the format version differs, and is then rebuilt. Run
+this file to build it ahead of time, e.g.
+
+    python Platformer/bundle.py assets.bundle
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+import sys
+import time
+
+
+MAGIC = b'PAST'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+ALIGN = 64
+
+#images the front end draws itself
+BACKGROUNDS = [
+    "img/Pixel Adventure/Background/Yellow.png",
+    "img/Pixel Adventure/Background/Blue.png",
+    "img/Pixel Adventure/Background/Brown.png",
+    "img/Pixel Adventure/Background/Gray.png",
+    "img/Pixel Adventure/Background/Green.png",
+    "img/Pixel Adventure/Background/Pink.png",
+    "img/Pixel Adventure/Background/Purple.png",
+]
+BUTTONS = {
+    'restart': "img/Pixel Adventure/Menu/Buttons/Restart.png",
+    'start': "img/Pixel Adventure/Menu/Buttons/Play.png",
+    'exit': "img/Pixel Adventure/Menu/Buttons/Close.png",
+}
+
+
+class BundleError(ValueError):
+    pass
+
+
+def pixel_format():
+    #byte order of the surfaces convert_alpha() makes, or None when they cannot be stored as plain 32-bit pixels
+    import pygame
+    probe = pygame.Surface((1, 1), pygame.SRCALPHA, 32)
+    if pygame.display.get_surface() is not None:
+        probe = probe.convert_alpha()
+    formats = {
+        (0xFF0000, 0xFF00, 0xFF, 0xFF000000): 'BGRA',
+        (0xFF, 0xFF00, 0xFF0000, 0xFF000000): 'RGBA',
+    }
+    if probe.get_bitsize() != 32:
+        return None
+    return formats.get(probe.get_masks())
+
+
+def file_hash(filename):
+    with open(filename, 'rb') as src:
+        return hashlib.sha1(src.read()).hexdigest()
+
+
+def warm(cache):
+    #load everything the game can ask the cache for: a world with every tile type, the player, and the front end's images
+    from simulation import World, Player
+    #the world's sprites go back to the pool, so the levels built after this reuse them rather than adding to them
+    World([list(range(9))]).release()
+    Player(0, 0)
+    for filename in BACKGROUNDS + list(BUTTONS.values()):
+        cache.get_image(filename)
+
+
+def dumps(cache):
+    import pygame
+    fmt = pixel_format() or 'RGBA'
+    surfaces = []
+    surface_index = {}
+
+    def locate(image):
+        #the surface holding an image's pixels, and the image's rect in it
+        parent = image.get_parent() or image
+        if id(parent) not in surface_index:
+            surface_index[id(parent)] = len(surfaces)
+            surfaces.append(parent)
+        x, y = image.get_offset() if image.get_parent() is not None else (0, 0)
+        return [surface_index[id(parent)], x, y, image.get_width(), image.get_height()]
+
+    def colorkey(image):
+        key = image.get_colorkey()
+        return list(key) if key is not None else None
+
+    with cache.lock:
+        #the whole sheets frames were sliced from are not needed once the frames are in the bundle
+        sheets = {key[0] for key in cache.frames}
+        images = [[list(key), locate(image), colorkey(image)] for key, image in cache.images.items()
+                  if key[0] not in sheets or key[1] is not None]
+        frames = [[list(key), [locate(image) for image in frame_list], colorkey(frame_list[0]) if frame_list else None]
+                  for key, frame_list in cache.frames.items()]
+        sources = sorted({key[0] for key in cache.images} | {key[0] for key in cache.frames})
+        atlas = cache.atlas
+
+    data = bytearray()
+    records = []
+    for surface in surfaces:
+        data += bytes(-len(data) % ALIGN)
+        records.append([surface.get_width(), surface.get_height(), len(data), bool(surface.get_flags() & pygame.SRCALPHA)])
+        data += pygame.image.tobytes(surface, fmt)
+    index = {
+        'format': fmt,
+        'sources': {filename: file_hash(filename) for filename in sources},
+        'surfaces': records,
+        'pages': [surface_index[id(page)] for page in atlas.pages if id(page) in surface_index] if atlas is not None else [],
+        'atlas': [atlas.frames, atlas.used_area] if atlas is not None else None,
+        'images': images,
+        'frames': frames,
+    }
+    index = json.dumps(index, separators=(',', ':')).encode()
+    data_offset = HEADER.size + len(index)
+    data_offset += -data_offset % ALIGN
+    page_size = atlas.page_size if atlas is not None else 0
+    out = bytearray(HEADER.pack(MAGIC, VERSION, page_size, len(index), data_offset))
+    out += index
+    out += bytes(data_offset - len(out))
+    out += data
+    return bytes(out)
+
+
+def build(cache, filename):
+    #fill the cache the slow way and write what it holds to the bundle
+    warm(cache)
+    data = dumps(cache)
+    with open(filename, 'wb') as out:
+        out.write(data)
+    return len(data)
+
+
+def install(cache, filename):
+    #add every image and frame list in an up to date bundle to the cache, raises BundleError if it is missing or stale
+    import pygame
+    try:
+        with open(filename, 'rb') as src:
+            mapping = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError) as error:
+        raise BundleError(f'cannot open {filename}: {error}')
+    if len(mapping) < HEADER.size:
+        raise BundleError('file is too short for a bundle header')
+    magic, version, page_size, index_length, data_offset = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise BundleError(f'bad magic {magic!r}')
+    if version != VERSION:
+        raise BundleError(f'bundle version {version}, expected {VERSION}')
+    expected_page_size = cache.atlas.page_size if cache.atlas is not None else 0
+    if page_size != expected_page_size:
+        raise BundleError(f'built for atlas page size {page_size}, the cache uses {expected_page_size}')
+    index = json.loads(mapping[HEADER.size:HEADER.size + index_length])
+    for source, digest in index['sources'].items():
+        try:
+            current = file_hash(source)
+        except OSError:
+            current = None
+        if current != digest:
+            raise BundleError(f'{source} has changed')
+
+    #surfaces share the mapping's pages, and are only converted if the display wants another format
+    view = memoryview(mapping)
+    convert = pygame.display.get_surface() is not None and index['format'] != pixel_format()
+    surfaces = []
+    for width, height, offset, alpha in index['surfaces']:
+        surface = pygame.image.frombuffer(view[data_offset + offset:data_offset + offset + width * height * 4], (width, height), index['format'])
+        if not alpha and pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        elif convert:
+            surface = surface.convert_alpha()
+        surfaces.append(surface)
+
+    def image_at(location, colorkey):
+        surface, x, y, width, height = location
+        image = surfaces[surface]
+        if (x, y, width, height) != (0, 0, image.get_width(), image.get_height()):
+            image = image.subsurface((x, y, width, height))
+        if colorkey is not None:
+            image.set_colorkey(colorkey)
+        return image
+
+    images = {}
+    for (source, size, alpha), location, colorkey in index['images']:
+        images[(source, tuple(size) if size is not None else None, alpha)] = image_at(location, colorkey)
+    frames = {}
+    for (source, steps, width, height, scale, color, flipped), locations, colorkey in index['frames']:
+        frames[(source, steps, width, height, scale, tuple(color), flipped)] = [image_at(location, colorkey) for location in locations]
+    pages = [surfaces[page] for page in index['pages']]
+    cache.add(images, frames, pages, index['atlas'], mapping)
+    return len(images) + len(frames)
+
+
+def main():
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from assets import cache
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'assets.bundle'
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    pygame.init()
+    #a display so frames are converted the way the game converts them
+    pygame.display.set_mode((1, 1))
+    if page_size:
+        cache.enable_atlas(page_size)
+    start = time.perf_counter()
+    size = build(cache, filename)
+    built = time.perf_counter() - start
+    cache.clear()
+    if page_size:
+        cache.enable_atlas(page_size)
+    start = time.perf_counter()
+    entries = install(cache, filename)
+    installed = time.perf_counter() - start
+    print(f'{filename}: {size / 1024:.0f} KiB, {entries} entries, '
+          f'decoding {built * 1000:.1f} ms, installing {installed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+camera.py: Scrolling camera and chunked tilemap for levels larger than the screen.
+The level is split into fixed-size chunks that are each pre-rendered (background
+and tiles) to a cached surface the first time they come into view. Only chunks
+that intersect the viewport are drawn, and chunk surfaces are evicted least
+recently used first, so memory and frame cost follow the screen size rather
+than the level size.
+"""
+
+import math
+from collections import OrderedDict
+import pygame
+
+
+class Camera():
+    def __init__(self, width, height) -> None:
+        self.view = pygame.Rect(0, 0, width, height)
+        self.bounds = pygame.Rect(0, 0, width, height)
+
+    def set_bounds(self, width, height):
+        self.bounds = pygame.Rect(0, 0, width, height)
+        self.view.topleft = (0, 0)
+
+    def follow(self, rect):
+        #centre on the target without showing anything outside the level
+        x = rect.centerx - self.view.width // 2
+        y = rect.centery - self.view.height // 2
+        self.view.x = max(0, min(x, self.bounds.width - self.view.width))
+        self.view.y = max(0, min(y, self.bounds.height - self.view.height))
+
+    @property
+    def offset(self):
+        return (-self.view.x, -self.view.y)
+
+    def apply(self, rect):
+        #world rect to screen rect
+        return rect.move(-self.view.x, -self.view.y)
+
+
+class ChunkedTileMap():
+    def __init__(self, world, bg_img, bg_size, max_chunks=64) -> None:
+        self.world = world
+        self.bg_img = bg_img
+        self.bg_size = bg_size
+        self.chunk_size = world.chunk_size
+        grid = world.tile_grid
+        self.chunk_tiles = self.chunk_size // grid.tile_size
+        self.cols = math.ceil(grid.cols / self.chunk_tiles)
+        self.rows = math.ceil(grid.rows / self.chunk_tiles)
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def visible_chunks(self, view):
+        first_col = max(view.left // self.chunk_size, 0)
+        last_col = min((view.right - 1) // self.chunk_size, self.cols - 1)
+        first_row = max(view.top // self.chunk_size, 0)
+        last_row = min((view.bottom - 1) // self.chunk_size, self.rows - 1)
+        return [(col, row) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+    def render_chunk(self, col, row):
+        surface = pygame.Surface((self.chunk_size, self.chunk_size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        #the background pattern lines up across chunks as long as the chunk size is a multiple of it
+        for y in range(0, self.chunk_size, self.bg_size):
+            for x in range(0, self.chunk_size, self.bg_size):
+                surface.blit(self.bg_img, (x, y))
+        grid = self.world.tile_grid
+        left, top = col * self.chunk_size, row * self.chunk_size
+        surface.blits([(tile[0], (tile[1].x - left, tile[1].y - top))
+                       for tile in grid.query(left, top, self.chunk_size, self.chunk_size)], False)
+        return surface
+
+    def get_chunk(self, col, row):
+        key = (col, row)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.chunks.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.render_chunk(col, row)
+        self.chunks[key] = surface
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def draw(self, surface, camera):
+        surface.blits([(self.get_chunk(col, row), (col * self.chunk_size - camera.view.x, row * self.chunk_size - camera.view.y))
+                       for col, row in self.visible_chunks(camera.view)], False)
+
+    def stats(self):
+        return {
+            'resident_chunks': len(self.chunks),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def draw_group(surface, world, group, camera, skip=None):
+    #draw the sprites of a group that are near the viewport, offset by the camera
+    view = camera.view
+    surface.blits([(sprite.image, camera.apply(sprite.rect)) for sprite in world.sprites_in_area(group, view)
+                   if sprite is not skip and view.colliderect(sprite.rect)], False)
@@ -0,0 +1,122 @@
+"""
+collision.py: Spatial indexes used for collision checks.
+TileGrid is a dense occupancy grid of the solid level tiles, keyed by tile
+coordinates, so a moving rect only has to be tested against the handful of
+tiles in the cells it overlaps instead of every tile in the level.
+SpatialGrid is a sparse uniform grid of entities for the broad phase of the
+player's overlap checks: each entity is listed in every cell its area
+overlaps, so a query only tests the entities near the rect, however many
+the level holds. sweep() finds when a moving rect first touches another,
+for continuous collision that cannot tunnel through thin or fast objects.
+"""
+
+
+class TileGrid():
+    def __init__(self, cols, rows, tile_size) -> None:
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        #one slot per cell, holding the tile occupying it (or None)
+        self.cells = [None] * (cols * rows)
+
+    def add(self, col, row, tile):
+        self.cells[row * self.cols + col] = tile
+
+    def get(self, col, row):
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.cells[row * self.cols + col]
+        return None
+
+    def query(self, x, y, width, height):
+        #tiles whose cells overlap the area, in row-major order (same order as World.tile_list)
+        if width <= 0 or height <= 0:
+            return []
+        first_col = max(x // self.tile_size, 0)
+        last_col = min((x + width - 1) // self.tile_size, self.cols - 1)
+        first_row = max(y // self.tile_size, 0)
+        last_row = min((y + height - 1) // self.tile_size, self.rows - 1)
+        tiles = []
+        for row in range(first_row, last_row + 1):
+            offset = row * self.cols
+            for col in range(first_col, last_col + 1):
+                tile = self.cells[offset + col]
+                if tile is not None:
+                    tiles.append(tile)
+        return tiles
+
+    def query_sweep(self, rect, dx, dy):
+        #tiles that can touch the player's x sweep (rect moved by dx) or y sweep (rect moved by dy).
+        #a hit while moving up can push the y sweep down by up to one rect height plus one tile,
+        #so the area is padded by that much to give exactly the same hits as scanning every tile
+        x = min(rect.x, rect.x + dx)
+        y = min(rect.y, rect.y + dy)
+        width = rect.width + abs(dx)
+        height = rect.height + abs(dy)
+        if dy < 0:
+            height += rect.height + self.tile_size
+        return self.query(x, y, width, height)
+
+
+class SpatialGrid():
+    def __init__(self, cell_size) -> None:
+        self.cell_size = cell_size
+        #(col, row) -> items whose area overlaps the cell
+        self.cells = {}
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return range(rect.left // size, (rect.right - 1) // size + 1), range(rect.top // size, (rect.bottom - 1) // size + 1)
+
+    def insert(self, item, rect):
+        cols, rows = self.cell_range(rect)
+        for row in rows:
+            for col in cols:
+                self.cells.setdefault((col, row), []).append(item)
+
+    def remove(self, item, rect):
+        #rect has to be the area the item was inserted with
+        cols, rows = self.cell_range(rect)
+        for row in rows:
+            for col in cols:
+                items = self.cells.get((col, row))
+                if items is not None and item in items:
+                    items.remove(item)
+
+    def query(self, rect):
+        #items in the cells the rect overlaps, each once, for an exact test by the caller
+        cols, rows = self.cell_range(rect)
+        found = {}
+        for row in rows:
+            for col in cols:
+                for item in self.cells.get((col, row), ()):
+                    found[id(item)] = item
+        return found.values()
+
+
+def sweep(rect, dx, dy, target):
+    #(time, axis) of the first contact of rect moving by (dx, dy) with the still target, with time in [0, 1] and
+    #axis 'x' or 'y' for the sides that meet, or None if they do not touch. Rects already overlapping meet at
+    #time 0 on the axis they overlap least on.
+    entry, exit = [], []
+    for move, near, far, low, high in ((dx, rect.left, rect.right, target.left, target.right),
+                                       (dy, rect.top, rect.bottom, target.top, target.bottom)):
+        if move > 0:
+            entry.append((low - far) / move)
+            exit.append((high - near) / move)
+        elif move < 0:
+            entry.append((high - near) / move)
+            exit.append((low - far) / move)
+        elif far <= low or near >= high:
+            return None
+        else:
+            entry.append(float('-inf'))
+            exit.append(float('inf'))
+    start, end = max(entry), min(exit)
+    if start >= end or start > 1 or end <= 0:
+        return None
+    if start < 0:
+        overlap_x = min(rect.right, target.right) - max(rect.left, target.left)
+        overlap_y = min(rect.bottom, target.bottom) - max(rect.top, target.top)
+        return 0.0, 'x' if overlap_x < overlap_y else 'y'
+    #on a tie (meeting corner to corner) the rect lands on or bumps the target rather than stopping beside it
+    return start, 'y' if entry[1] >= entry[0] else 'x'
@@ -0,0 +1,159 @@
+"""
+editgrid.py: Editable tile grid for the level editor.
+EditGrid keeps the level in a NumPy array so bulk edits (rectangle fill,
+flood fill, pasting a region) are vectorized, and records every edit as a
+compact diff (the flat indices of the cells that changed, with their old and
+new values) for undo and redo. History is bounded by the number of cells it
+holds rather than by a count of full snapshots.
+"""
+
+from collections import deque, namedtuple
+import numpy as np
+import levelfile
+
+
+#flat indices of the changed cells, with their values before and after
+Edit = namedtuple('Edit', ['indices', 'old', 'new'])
+
+
+class EditGrid():
+    def __init__(self, cols, rows, max_history_cells=1 << 20, params=None) -> None:
+        self.cells = np.zeros((rows, cols), dtype=np.uint8)
+        #per-cell parameter records of the level file, kept as they are so saving does not drop them
+        self.params = dict(params) if params is not None else {}
+        self.max_history_cells = max_history_cells
+        #oldest edits are dropped from the front once the history is full
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.history_cells = 0
+
+    @classmethod
+    def from_level(cls, level, max_history_cells=1 << 20):
+        grid = cls(level.cols, level.rows, max_history_cells, level.params)
+        grid.cells[:] = level.as_array()
+        return grid
+
+    @property
+    def cols(self):
+        return self.cells.shape[1]
+
+    @property
+    def rows(self):
+        return self.cells.shape[0]
+
+    #rows can be indexed like the old nested lists, world_data[row][col]
+    def __getitem__(self, row):
+        return self.cells[row]
+
+    def __len__(self):
+        return self.rows
+
+    def to_level(self):
+        return levelfile.Level(self.cols, self.rows, self.cells.tobytes(), dict(self.params))
+
+    def clip(self, col0, row0, col1, row1):
+        #inclusive corners in any order to a slice pair clipped to the grid, or None if outside it
+        col0, col1 = sorted((col0, col1))
+        row0, row1 = sorted((row0, row1))
+        col0, row0 = max(col0, 0), max(row0, 0)
+        col1, row1 = min(col1, self.cols - 1), min(row1, self.rows - 1)
+        if col0 > col1 or row0 > row1:
+            return None
+        return slice(row0, row1 + 1), slice(col0, col1 + 1)
+
+    def apply(self, mask, values):
+        #set the cells under a boolean mask, record the diff, and return the (col0, row0, col1, row1) it spans
+        changed = mask & (self.cells != values)
+        indices = np.flatnonzero(changed).astype(np.int32)
+        if not len(indices):
+            return None
+        flat = self.cells.reshape(-1)
+        new = np.broadcast_to(values, self.cells.shape).reshape(-1)[indices].copy()
+        edit = Edit(indices, flat[indices].copy(), new)
+        flat[indices] = new
+        self.push(edit)
+        return self.bounds(indices)
+
+    def push(self, edit):
+        self.undo_stack.append(edit)
+        self.history_cells += len(edit.indices)
+        for old in self.redo_stack:
+            self.history_cells -= len(old.indices)
+        self.redo_stack.clear()
+        #drop the oldest edits once the history holds too many cells, but always keep the newest one
+        while self.history_cells > self.max_history_cells and len(self.undo_stack) > 1:
+            self.history_cells -= len(self.undo_stack.popleft().indices)
+
+    def bounds(self, indices):
+        rows, cols = np.divmod(indices, self.cols)
+        return int(cols.min()), int(rows.min()), int(cols.max()), int(rows.max())
+
+    def set(self, col, row, value):
+        mask = np.zeros(self.cells.shape, dtype=bool)
+        mask[row, col] = True
+        return self.apply(mask, value)
+
+    def fill_rect(self, col0, row0, col1, row1, value):
+        area = self.clip(col0, row0, col1, row1)
+        if area is None:
+            return None
+        mask = np.zeros(self.cells.shape, dtype=bool)
+        mask[area] = True
+        return self.apply(mask, value)
+
+    def flood_region(self, col, row):
+        #cells 4-connected to (col, row) with the same tile, grown a ring at a time over the whole array
+        same = self.cells == self.cells[row, col]
+        region = np.zeros(self.cells.shape, dtype=bool)
+        region[row, col] = True
+        while True:
+            grown = region.copy()
+            grown[1:, :] |= region[:-1, :]
+            grown[:-1, :] |= region[1:, :]
+            grown[:, 1:] |= region[:, :-1]
+            grown[:, :-1] |= region[:, 1:]
+            grown &= same
+            if np.array_equal(grown, region):
+                return region
+            region = grown
+
+    def flood_fill(self, col, row, value):
+        return self.apply(self.flood_region(col, row), value)
+
+    def copy(self, col0, row0, col1, row1):
+        area = self.clip(col0, row0, col1, row1)
+        if area is None:
+            return None
+        return self.cells[area].copy()
+
+    def paste(self, col, row, region):
+        #paste with the region's top left at (col, row), clipped to the grid
+        area = self.clip(col, row, col + region.shape[1] - 1, row + region.shape[0] - 1)
+        if area is None:
+            return None
+        values = np.zeros(self.cells.shape, dtype=np.uint8)
+        mask = np.zeros(self.cells.shape, dtype=bool)
+        values[area] = region[area[0].start - row:area[0].stop - row, area[1].start - col:area[1].stop - col]
+        mask[area] = True
+        return self.apply(mask, values)
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.cells.reshape(-1)[edit.indices] = edit.old
+        self.redo_stack.append(edit)
+        return self.bounds(edit.indices)
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.cells.reshape(-1)[edit.indices] = edit.new
+        self.undo_stack.append(edit)
+        return self.bounds(edit.indices)
+
+    def clear_history(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.history_cells = 0
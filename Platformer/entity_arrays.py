@@ -0,0 +1,156 @@
+"""
+entity_arrays.py: Struct-of-arrays update for enemies and moving platforms.
+Positions, directions, move counters, idle timers and the enemies' animation
+indices live in NumPy arrays and every enemy and platform is advanced with a
+few vectorized operations per tick; platforms are animated by the world's
+clock like the sprites. The sprites are only brought up to date (rect and
+image) when they are about to be drawn, and the player's collision checks
+read the arrays directly.
+"""
+
+import numpy as np
+
+
+#ticks between animation frames, same as the sprite classes
+animation_cooldown = 5
+#ticks a patrol lasts before turning around
+patrol_length = 50
+
+
+class EntityArrays():
+    def __init__(self, world) -> None:
+        #the world's idle schedule, whose next event goes to each enemy that starts idling
+        self.schedule = world.idle_schedule
+        self.enemies = world.enemy_group.sprites()
+        self.platforms = world.platform_group.sprites()
+
+        #enemies
+        self.enemy_x = np.array([e.rect.x for e in self.enemies], dtype=np.int32)
+        self.enemy_y = np.array([e.rect.y for e in self.enemies], dtype=np.int32)
+        self.enemy_w = np.array([e.rect.width for e in self.enemies], dtype=np.int32)
+        self.enemy_h = np.array([e.rect.height for e in self.enemies], dtype=np.int32)
+        self.enemy_direction = np.array([e.move_direction for e in self.enemies], dtype=np.int32)
+        self.enemy_move_counter = np.array([e.move_counter for e in self.enemies], dtype=np.int32)
+        self.enemy_idle_time = np.array([e.idle_time for e in self.enemies], dtype=np.int32)
+        self.enemy_moves_left = np.array([e.moves_left for e in self.enemies], dtype=np.int32)
+        self.enemy_next_idle = np.array([e.next_idle for e in self.enemies], dtype=np.int32)
+        self.enemy_action = np.array([e.action for e in self.enemies], dtype=np.int32)
+        self.enemy_index = np.array([e.index for e in self.enemies], dtype=np.int32)
+        self.enemy_counter = np.array([e.counter for e in self.enemies], dtype=np.int32)
+        #action, index and facing of the frame each enemy was given on its last animation step, -1 until it has one
+        self.enemy_shown_action = np.full(len(self.enemies), -1, dtype=np.int32)
+        self.enemy_shown_index = np.zeros(len(self.enemies), dtype=np.int32)
+        self.enemy_shown_direction = np.zeros(len(self.enemies), dtype=np.int32)
+        #every enemy shares the same frame lists, so the frame counts per action are too
+        if self.enemies:
+            self.enemy_frames = np.array([len(frames) for frames in self.enemies[0].images_right], dtype=np.int32)
+        else:
+            self.enemy_frames = np.zeros(2, dtype=np.int32)
+
+        #platforms
+        self.platform_x = np.array([p.rect.x for p in self.platforms], dtype=np.int32)
+        self.platform_y = np.array([p.rect.y for p in self.platforms], dtype=np.int32)
+        self.platform_w = np.array([p.rect.width for p in self.platforms], dtype=np.int32)
+        self.platform_h = np.array([p.rect.height for p in self.platforms], dtype=np.int32)
+        self.platform_move_x = np.array([p.move_x for p in self.platforms], dtype=np.int32)
+        self.platform_move_y = np.array([p.move_y for p in self.platforms], dtype=np.int32)
+        self.platform_direction = np.array([p.move_direction for p in self.platforms], dtype=np.int32)
+        self.platform_move_counter = np.array([p.move_counter for p in self.platforms], dtype=np.int32)
+
+    def update(self):
+        self.update_enemies()
+        self.update_platforms()
+
+    def update_enemies(self):
+        if not self.enemies:
+            return
+        idle = self.enemy_idle_time > 0
+        moving = ~idle
+        self.enemy_action = moving.astype(np.int32)
+        self.enemy_idle_time -= idle
+        self.enemy_x += self.enemy_direction * moving
+        self.enemy_move_counter += moving
+        #enemies whose countdown runs out stop for their scheduled idle, and take the next event
+        self.enemy_moves_left -= moving
+        start_idle = moving & (self.enemy_moves_left == 0)
+        starting = np.flatnonzero(start_idle)
+        if len(starting):
+            self.enemy_idle_time[starting] = self.enemy_next_idle[starting]
+            events = np.array(self.schedule.take(len(starting)), dtype=np.int32)
+            self.enemy_moves_left[starting] = events[:, 0]
+            self.enemy_next_idle[starting] = events[:, 1]
+
+        #handle animation
+        self.enemy_counter += 1
+        step = self.enemy_counter > animation_cooldown
+        self.enemy_counter[step] = 0
+        self.enemy_index += step
+        self.enemy_index[step & (self.enemy_index >= self.enemy_frames[self.enemy_action])] = 0
+        #like the sprites, an enemy only changes frame on an animation step, facing the way it moved that tick
+        self.enemy_shown_action[step] = self.enemy_action[step]
+        self.enemy_shown_index[step] = self.enemy_index[step]
+        self.enemy_shown_direction[step] = self.enemy_direction[step]
+
+        turn = np.abs(self.enemy_move_counter) > patrol_length
+        self.enemy_direction[turn] *= -1
+        self.enemy_move_counter[turn] *= -1
+
+    def update_platforms(self):
+        if not self.platforms:
+            return
+        self.platform_x += self.platform_direction * self.platform_move_x
+        self.platform_y += self.platform_direction * self.platform_move_y
+        self.platform_move_counter += 1
+        turn = np.abs(self.platform_move_counter) > patrol_length
+        self.platform_direction[turn] *= -1
+        self.platform_move_counter[turn] *= -1
+
+    def enemy_hit(self, rect):
+        #whether any enemy overlaps the rect, same test as Rect.colliderect
+        if not self.enemies:
+            return False
+        hit = ((self.enemy_x < rect.right) & (self.enemy_x + self.enemy_w > rect.x) &
+               (self.enemy_y < rect.bottom) & (self.enemy_y + self.enemy_h > rect.y))
+        return bool(hit.any())
+
+    def platforms_near(self, x, y, width, height):
+        #platforms overlapping the area, in group order, with their sprites brought up to date
+        if not self.platforms:
+            return []
+        near = ((self.platform_x < x + width) & (self.platform_x + self.platform_w > x) &
+                (self.platform_y < y + height) & (self.platform_y + self.platform_h > y))
+        platforms = []
+        for i in np.flatnonzero(near):
+            platform = self.platforms[i]
+            platform.rect.x = int(self.platform_x[i])
+            platform.rect.y = int(self.platform_y[i])
+            platform.move_direction = int(self.platform_direction[i])
+            platform.move_counter = int(self.platform_move_counter[i])
+            platforms.append(platform)
+        return platforms
+
+    def sync(self):
+        #copy the arrays back onto the sprites before they are drawn
+        for i, enemy in enumerate(self.enemies):
+            enemy.rect.x = int(self.enemy_x[i])
+            enemy.move_direction = int(self.enemy_direction[i])
+            enemy.move_counter = int(self.enemy_move_counter[i])
+            enemy.idle_time = int(self.enemy_idle_time[i])
+            enemy.moves_left = int(self.enemy_moves_left[i])
+            enemy.next_idle = int(self.enemy_next_idle[i])
+            enemy.action = int(self.enemy_action[i])
+            enemy.index = int(self.enemy_index[i])
+            enemy.counter = int(self.enemy_counter[i])
+            action = int(self.enemy_shown_action[i])
+            if action < 0:
+                continue
+            index = int(self.enemy_shown_index[i])
+            if self.enemy_shown_direction[i] == -1:
+                enemy.image = enemy.images_right[action][index]
+            else:
+                enemy.image = enemy.images_left[action][index]
+        for i, platform in enumerate(self.platforms):
+            platform.rect.x = int(self.platform_x[i])
+            platform.rect.y = int(self.platform_y[i])
+            platform.move_direction = int(self.platform_direction[i])
+            platform.move_counter = int(self.platform_move_counter[i])
@@ -15,9 +15,10 @@ __email__ = "kkastner@alumni.nd.edu"
 __status__ = "Prototype"
 
 import pygame
-import pickle
 import math
 from os import path
+import levelfile
+from editgrid import EditGrid
 
 
 pygame.init()
@@ -35,12 +36,14 @@ SCREEN_HEIGHT = (tile_size * cols) + margin
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption('Level Editor')
 
-def populateBackground(img, img_size):
+def populateBackground(img, img_size, surface=None):
+    if surface is None:
+        surface = screen
     numWidthTiles = math.ceil(SCREEN_WIDTH / img_size)
     numHeightTiles = math.ceil(SCREEN_WIDTH / img_size)
     for i in range(numHeightTiles):
         for j in range(numWidthTiles):
-            screen.blit(img, (j * img_size, i * img_size))
+            surface.blit(img, (j * img_size, i * img_size))
 
 #load images
 bg_img = [None for _ in range(7)]
@@ -68,6 +71,15 @@ load_img = pygame.transform.scale(load_img, (tile_size * 4, tile_size))
 #define game variables
 clicked = False
 level = 1
+#'cycle' steps a cell through the tiles, 'rect' fills a dragged rectangle, 'fill' flood fills,
+#'copy' copies a dragged rectangle and 'paste' pastes it
+tool = 'cycle'
+brush = 1
+clipboard = None
+drag_start = None
+drag_value = 0
+tool_keys = {pygame.K_e: 'cycle', pygame.K_r: 'rect', pygame.K_f: 'fill', pygame.K_c: 'copy', pygame.K_v: 'paste'}
+brush_keys = {getattr(pygame, f'K_{tile}'): tile for tile in range(9)}
 
 #define colours
 white = (255, 255, 255)
@@ -76,11 +88,8 @@ green = (144, 201, 120)
 
 font = pygame.font.SysFont('Futura', 24)
 
-#create empty tile list
-world_data = []
-for row in range(cols):
-	r = [0] * cols
-	world_data.append(r)
+#create empty tile grid
+world_data = EditGrid(cols, cols)
 
 #create boundary
 for tile in range(0, cols):
@@ -94,50 +103,67 @@ def draw_text(text, font, text_col, x, y):
 	img = font.render(text, True, text_col)
 	screen.blit(img, (x, y))
 
-def draw_grid():
+def draw_grid(surface):
 	for c in range(cols+1):
 		#vertical lines
-		pygame.draw.line(screen, white, (c * tile_size, 0), (c * tile_size, SCREEN_HEIGHT - margin))
+		pygame.draw.line(surface, white, (c * tile_size, 0), (c * tile_size, SCREEN_HEIGHT - margin))
 		#horizontal lines
-		pygame.draw.line(screen, white, (0, c * tile_size), (SCREEN_WIDTH, c * tile_size))
-
-
-def draw_world():
-	for row in range(cols):
-		for col in range(cols):
-			if world_data[row][col] > 0:
-				if world_data[row][col] == 1:
-					#dirt blocks
-					img = pygame.transform.scale(dirt_img, (tile_size, tile_size))
-					screen.blit(img, (col * tile_size, row * tile_size))
-				if world_data[row][col] == 2:
-					#grass blocks
-					img = pygame.transform.scale(grass_img, (tile_size, tile_size))
-					screen.blit(img, (col * tile_size, row * tile_size))
-				if world_data[row][col] == 3:
-					#enemy blocks
-					img = pygame.transform.scale(enemy_img, (tile_size, int(tile_size * 0.75)))
-					screen.blit(img, (col * tile_size, row * tile_size + (tile_size * 0.25)))
-				if world_data[row][col] == 4:
-					#horizontally moving platform
-					img = pygame.transform.scale(platform_x_img, (tile_size, tile_size // 2))
-					screen.blit(img, (col * tile_size, row * tile_size))
-				if world_data[row][col] == 5:
-					#vertically moving platform
-					img = pygame.transform.scale(platform_y_img, (tile_size, tile_size // 2))
-					screen.blit(img, (col * tile_size, row * tile_size))
-				if world_data[row][col] == 6:
-					#spikes
-					img = pygame.transform.scale(spikes_img, (tile_size, tile_size // 2))
-					screen.blit(img, (col * tile_size, row * tile_size + (tile_size // 2)))
-				if world_data[row][col] == 7:
-					#apple
-					img = pygame.transform.scale(apple_img, (tile_size, tile_size))
-					screen.blit(img, (col * tile_size + (tile_size // 16), row * tile_size + (tile_size // 16)))
-				if world_data[row][col] == 8:
-					#exit
-					img = pygame.transform.scale(end_img, (tile_size, int(tile_size * 1.5)))
-					screen.blit(img, (col * tile_size, row * tile_size - (tile_size // 2)))
+		pygame.draw.line(surface, white, (0, c * tile_size), (SCREEN_WIDTH, c * tile_size))
+
+
+#each tile type's image, scaled once, and where it sits in its cell
+tile_images = {
+	1: (pygame.transform.scale(dirt_img, (tile_size, tile_size)), (0, 0)),
+	2: (pygame.transform.scale(grass_img, (tile_size, tile_size)), (0, 0)),
+	3: (pygame.transform.scale(enemy_img, (tile_size, int(tile_size * 0.75))), (0, int(tile_size * 0.25))),
+	4: (pygame.transform.scale(platform_x_img, (tile_size, tile_size // 2)), (0, 0)),
+	5: (pygame.transform.scale(platform_y_img, (tile_size, tile_size // 2)), (0, 0)),
+	6: (pygame.transform.scale(spikes_img, (tile_size, tile_size // 2)), (0, tile_size // 2)),
+	7: (pygame.transform.scale(apple_img, (tile_size, tile_size)), (tile_size // 16, tile_size // 16)),
+	8: (pygame.transform.scale(end_img, (tile_size, int(tile_size * 1.5))), (0, -(tile_size // 2))),
+}
+
+#the background, grid and tiles are composited here once and only the parts that change are redrawn
+#(one pixel taller than the tile area, for the grid's closing line)
+canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT - margin + 1)).convert()
+
+def tile_rect(col, row, tile):
+	#area a tile covers on the canvas, which can spill into the neighbouring cells
+	img, offset = tile_images[tile]
+	return img.get_rect(topleft=(col * tile_size + offset[0], row * tile_size + offset[1]))
+
+def redraw_area(area):
+	area = pygame.Rect(area).clip(canvas.get_rect())
+	canvas.set_clip(area)
+	canvas.fill(green)
+	populateBackground(bg_img[level % 7], 64, canvas)
+	draw_grid(canvas)
+	#tiles are drawn in row order, like a full redraw, so overlapping tiles stack the same way
+	for row in range(max(area.top // tile_size - 1, 0), min(area.bottom // tile_size + 2, cols)):
+		for col in range(max(area.left // tile_size - 1, 0), min(area.right // tile_size + 2, cols)):
+			tile = world_data[row][col]
+			if tile > 0:
+				img, offset = tile_images[tile]
+				canvas.blit(img, (col * tile_size + offset[0], row * tile_size + offset[1]))
+	canvas.set_clip(None)
+
+def redraw_world():
+	redraw_area(canvas.get_rect())
+
+#how far any tile's image can reach outside its cell
+spill = pygame.Rect(0, 0, tile_size, tile_size).unionall([tile_rect(0, 0, tile) for tile in tile_images])
+
+def redraw_cells(changed):
+	#redraw everything the tiles in the changed (col0, row0, col1, row1) cells could have covered
+	if changed is None:
+		return
+	col0, row0, col1, row1 = changed
+	redraw_area((col0 * tile_size + spill.x, row0 * tile_size + spill.y,
+		(col1 - col0) * tile_size + spill.width, (row1 - row0) * tile_size + spill.height))
+
+def mouse_cell():
+	pos = pygame.mouse.get_pos()
+	return min(pos[0] // tile_size, cols - 1), min(pos[1] // tile_size, cols - 1)
 
 
 
@@ -171,6 +197,7 @@ class Button():
 #create load and save buttons
 save_button = Button(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 80, save_img)
 load_button = Button(SCREEN_WIDTH // 2 + 50, SCREEN_HEIGHT - 80, load_img)
+redraw_world()
 
 #main game loop
 run = True
@@ -178,31 +205,32 @@ while run:
 
 	clock.tick(fps)
 
-	#draw background
-	screen.fill(green)
-	populateBackground(bg_img[level % 7], 64)
+	#clear the panel below the level
+	screen.fill(green, (0, canvas.get_height(), SCREEN_WIDTH, SCREEN_HEIGHT - canvas.get_height()))
 
 	#load and save level
 	if save_button.draw():
 		#save level data
-		pickle_out = open(f'level{level}_data', 'wb')
-		pickle.dump(world_data, pickle_out)
-		pickle_out.close()
+		levelfile.save(levelfile.level_filename(level), world_data.to_level())
 	if load_button.draw():
 		#load in level data
-		if path.exists(f'level{level}_data'):
-			pickle_in = open(f'level{level}_data', 'rb')
-			world_data = pickle.load(pickle_in)
-
-
-	#show the grid and draw the level tiles
-	draw_grid()
-	draw_world()
-
+		if path.exists(levelfile.level_filename(level)):
+			world_data = EditGrid.from_level(levelfile.load(levelfile.level_filename(level)))
+			redraw_world()
+
+	#draw the composited background, grid and tiles
+	screen.blit(canvas, (0, 0))
+	#outline the rectangle being dragged out
+	if drag_start is not None:
+		col, row = mouse_cell()
+		pygame.draw.rect(screen, white, (min(col, drag_start[0]) * tile_size, min(row, drag_start[1]) * tile_size,
+			(abs(col - drag_start[0]) + 1) * tile_size, (abs(row - drag_start[1]) + 1) * tile_size), 3)
 
 	#text showing current level
 	draw_text(f'Level: {level}', font, black, tile_size, SCREEN_HEIGHT - 80)
 	draw_text('Press UP or DOWN to change level', font, black, tile_size, SCREEN_HEIGHT - 60)
+	draw_text(f'Tool: {tool}  Brush: {brush}', font, black, tile_size, SCREEN_HEIGHT - 40)
+	draw_text('E cycle, R rect, F fill, C copy, V paste, 0-8 brush, Ctrl+Z / Ctrl+Y undo / redo', font, black, tile_size, SCREEN_HEIGHT - 20)
 
 	#event handler
 	for event in pygame.event.get():
@@ -217,23 +245,48 @@ while run:
 			y = pos[1] // tile_size
 			#check that the coordinates are within the tile area
 			if x < cols and y < cols:
+				left = pygame.mouse.get_pressed()[0] == 1
+				right = pygame.mouse.get_pressed()[2] == 1
 				#update tile value
-				if pygame.mouse.get_pressed()[0] == 1:
-					world_data[y][x] += 1
-					if world_data[y][x] > 8:
-						world_data[y][x] = 0
-				elif pygame.mouse.get_pressed()[2] == 1:
-					world_data[y][x] -= 1
-					if world_data[y][x] < 0:
-						world_data[y][x] = 8
+				if tool == 'cycle':
+					if left:
+						redraw_cells(world_data.set(x, y, (int(world_data[y][x]) + 1) % 9))
+					elif right:
+						redraw_cells(world_data.set(x, y, (int(world_data[y][x]) - 1) % 9))
+				#the right button erases with the bulk tools
+				elif tool == 'fill' and (left or right):
+					redraw_cells(world_data.flood_fill(x, y, brush if left else 0))
+				elif tool == 'paste' and left and clipboard is not None:
+					redraw_cells(world_data.paste(x, y, clipboard))
+				elif tool in ('rect', 'copy') and (left or right):
+					drag_start = (x, y)
+					drag_value = brush if left else 0
 		if event.type == pygame.MOUSEBUTTONUP:
 			clicked = False
+			if drag_start is not None:
+				col, row = mouse_cell()
+				if tool == 'rect':
+					redraw_cells(world_data.fill_rect(drag_start[0], drag_start[1], col, row, drag_value))
+				else:
+					clipboard = world_data.copy(drag_start[0], drag_start[1], col, row)
+				drag_start = None
 		#up and down key presses to change level number
 		if event.type == pygame.KEYDOWN:
 			if event.key == pygame.K_UP:
 				level += 1
+				redraw_world()
 			elif event.key == pygame.K_DOWN and level > 1:
 				level -= 1
+				redraw_world()
+			elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+				redraw_cells(world_data.undo())
+			elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+				redraw_cells(world_data.redo())
+			elif event.key in tool_keys:
+				tool = tool_keys[event.key]
+				drag_start = None
+			elif event.key in brush_keys:
+				brush = brush_keys[event.key]
 
 	#update game display window
 	pygame.display.update()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+
+"""
+levelcheck.py: Offline check that levels can be finished.
+Searches the states the player can reach in a level (position, vertical
+speed, jump and ground flags, and the phase of the moving platforms) with
+the same movement and collision rules as Player.update, breadth first. To
+keep the search to seconds, states that are close together are merged: the
+position is tracked in --resolution px steps and the platform phase in
+--phase-step ticks, and only within --phase-margin tiles of the platforms'
+paths; elsewhere a state reached again later with the platforms in another
+position is treated as visited. Every run that is found is a real run, so
+the exit and apples it reports can be reached and the ticks to finish are an
+upper bound, but merging can miss a run, so what is not found is not proof
+that it cannot be reached. A level whose search goes over --max-states is
+reported as inconclusive. Levels are checked in parallel on a process pool.
+Run from the repository root, e.g.
+
+    python Platformer/levelcheck.py              # every level{N}.lvl
+    python Platformer/levelcheck.py level3.lvl --workers 2
+
+Enemies wander at random, so they are left out unless --avoid-enemies treats
+the whole stretch they patrol as deadly.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+import pygame
+import levelfile
+from collision import TileGrid
+from simulation import TICK_RATE, tile_size, player_x, player_y
+
+
+#player rect and movement, as in Player.update
+PLAYER_WIDTH = 20
+PLAYER_HEIGHT = 26
+PLAYER_X_OFFSET = 6
+PLAYER_Y_OFFSET = 6
+SPEED = 5
+JUMP_SPEED = -15
+GRAVITY = 1
+TERMINAL_SPEED = 10
+COL_THRESH = 20
+#moving platforms and enemies turn around after this many pixels
+PATROL = 50
+
+#most distinct states searched per level before giving up with an inconclusive result
+MAX_STATES = 1000000
+#horizontal input and whether jump is held, for every distinct key combination
+ACTIONS = [(dx, jump) for dx in (0, -SPEED, SPEED) for jump in (False, True)]
+
+
+def platform_phases():
+    #offset and direction of a moving platform after n updates, for one full back and forth
+    offset, direction, counter = 0, 1, 0
+    phases = [(0, 1)]
+    while True:
+        offset += direction
+        counter += 1
+        if abs(counter) > PATROL:
+            direction *= -1
+            counter *= -1
+        if (offset, direction, counter) == (0, 1, 0):
+            return phases
+        phases.append((offset, direction))
+
+
+class LevelModel():
+    def __init__(self, level, avoid_enemies=False, phase_margin=3, resolution=4, phase_step=34) -> None:
+        self.cols = level.cols
+        self.rows = level.rows
+        #states are told apart by their position in resolution px steps and their platform phase in phase_step steps
+        self.resolution = resolution
+        self.phase_step = phase_step
+        self.tile_grid = TileGrid(level.cols, level.rows, tile_size)
+        self.hazards = []
+        self.apples = []
+        self.exits = []
+        #(x, y, move_x, move_y) of each platform, in the order World creates them
+        self.platforms = []
+        for row in range(level.rows):
+            for col in range(level.cols):
+                tile = level.get(col, row)
+                x, y = col * tile_size, row * tile_size
+                if tile in (1, 2):
+                    self.tile_grid.add(col, row, (None, pygame.Rect(x, y, tile_size, tile_size)))
+                elif tile == 3 and avoid_enemies:
+                    self.hazards.append(pygame.Rect(x - PATROL - 1, y, tile_size + 2 * (PATROL + 1), tile_size))
+                elif tile == 4:
+                    self.platforms.append((x, y, 1, 0))
+                elif tile == 5:
+                    self.platforms.append((x, y, 0, 1))
+                elif tile == 6:
+                    self.hazards.append(pygame.Rect(x, y + tile_size // 2, tile_size, tile_size // 2))
+                elif tile == 7:
+                    self.apples.append(((col, row), pygame.Rect(x, y, tile_size, tile_size)))
+                elif tile == 8:
+                    self.exits.append(pygame.Rect(x, y, tile_size, tile_size))
+        #platform rects and directions for every phase, the platforms all move in step
+        self.phases = platform_phases() if self.platforms else [(0, 1)]
+        self.platform_rects = [
+            [(pygame.Rect(x + offset * move_x, y + offset * move_y, tile_size, 10), direction * move_x)
+             for x, y, move_x, move_y in self.platforms]
+            for offset, direction in self.phases
+        ]
+        self.floor = level.rows * tile_size
+        #platforms each cell can touch (the player moves less than a tile per tick, so a tile of margin is enough),
+        #and cells close enough to a platform's path for its timing to matter
+        self.cell_platforms = [() for _ in range(level.cols * level.rows)]
+        self.near_platforms = bytearray(level.cols * level.rows)
+        for index, (x, y, move_x, move_y) in enumerate(self.platforms):
+            path = pygame.Rect(x - (PATROL + 1) * move_x, y - (PATROL + 1) * move_y,
+                               tile_size + 2 * (PATROL + 1) * move_x, 10 + 2 * (PATROL + 1) * move_y)
+            for cell in self.cells(path.inflate(4 * tile_size, 4 * tile_size)):
+                self.cell_platforms[cell] += (index,)
+            for cell in self.cells(path.inflate(2 * phase_margin * tile_size, 2 * phase_margin * tile_size)):
+                self.near_platforms[cell] = 1
+        #apples, exits and hazards the player can touch from each cell
+        self.cell_items = [([], [], []) for _ in range(level.cols * level.rows)]
+        for kind, rects in enumerate(([apple for _, apple in self.apples], self.exits, self.hazards)):
+            for index, rect in enumerate(rects):
+                for cell in self.cells(rect.inflate(4 * tile_size, 4 * tile_size)):
+                    self.cell_items[cell][kind].append(index)
+        #tile collisions do not depend on the platforms, so they are shared by every phase
+        self.tile_hits = {}
+
+    def cells(self, rect):
+        for row in range(max(rect.top // tile_size, 0), min((rect.bottom - 1) // tile_size + 1, self.rows)):
+            for col in range(max(rect.left // tile_size, 0), min((rect.right - 1) // tile_size + 1, self.cols)):
+                yield row * self.cols + col
+
+    def cell(self, x, y):
+        #cell under the middle of the player, or None outside the level
+        col = (x + PLAYER_WIDTH // 2) // tile_size
+        row = (y + PLAYER_HEIGHT // 2) // tile_size
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return None
+
+    def start(self):
+        return (player_x + PLAYER_X_OFFSET, player_y + PLAYER_Y_OFFSET, 0, False, True, 0)
+
+    def contacts(self, x, y):
+        #apples touched, and whether the player is at the exit or dead, with the rect at (x, y)
+        cell = self.cell(x, y)
+        if cell is None:
+            #off the top of the level is fine, off the sides or bottom there is nothing to come back to
+            return [], False, y > self.floor or not 0 <= x + PLAYER_WIDTH // 2 < self.cols * tile_size
+        apples, exits, hazards = self.cell_items[cell]
+        touched = [index for index in apples if self.apples[index][1].colliderect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT)]
+        at_exit = any(self.exits[index].colliderect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT) for index in exits)
+        dead = any(self.hazards[index].colliderect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT) for index in hazards)
+        return touched, at_exit, dead
+
+    def key(self, state):
+        #states this close together are treated as one, and the first one reached stands for the rest.
+        #away from the platforms their phase does not change what happens, so those states are merged across phases
+        x, y, vel_y, jumped, in_air, phase = state
+        cell = self.cell(x, y)
+        if cell is None or not self.near_platforms[cell]:
+            phase = -1
+        else:
+            phase //= self.phase_step
+        return (x // self.resolution, y // self.resolution, vel_y, jumped, in_air, phase)
+
+    def hit_tiles(self, x, y, dx, vel_y):
+        key = (x, y, dx, vel_y)
+        hit = self.tile_hits.get(key)
+        if hit is not None:
+            return hit
+        dy = vel_y
+        in_air = True
+        for _, tile in self.tile_grid.query_sweep(pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT), dx, dy):
+            if tile.colliderect(x + dx, y, PLAYER_WIDTH, PLAYER_HEIGHT):
+                dx = 0
+            if tile.colliderect(x, y + dy, PLAYER_WIDTH, PLAYER_HEIGHT):
+                if vel_y < 0:
+                    dy = tile.bottom - y
+                    vel_y = 0
+                elif vel_y >= 0:
+                    dy = tile.top - (y + PLAYER_HEIGHT)
+                    in_air = False
+        hit = self.tile_hits[key] = (dx, dy, vel_y, in_air)
+        return hit
+
+    def step(self, state, dx, jump):
+        #one tick of Player.update, returns the next state
+        x, y, vel_y, jumped, in_air, phase = state
+        phase = (phase + 1) % len(self.phases)
+        if jump and not jumped and not in_air:
+            vel_y = JUMP_SPEED
+            jumped = True
+        if not jump:
+            jumped = False
+        vel_y = min(vel_y + GRAVITY, TERMINAL_SPEED)
+        dx, dy, vel_y, in_air = self.hit_tiles(x, y, dx, vel_y)
+
+        cell = self.cell(x, y)
+        if cell is not None and self.cell_platforms[cell]:
+            platforms = self.platform_rects[phase]
+            for index in self.cell_platforms[cell]:
+                platform, push = platforms[index]
+                if platform.colliderect(x + dx, y, PLAYER_WIDTH, PLAYER_HEIGHT):
+                    dx = 0
+                if platform.colliderect(x, y + dy, PLAYER_WIDTH, PLAYER_HEIGHT):
+                    if abs((y + dy) - platform.bottom) < COL_THRESH:
+                        vel_y = 0
+                        dy = platform.bottom - y
+                    elif abs((y + PLAYER_HEIGHT + dy) - platform.top) < COL_THRESH:
+                        y = platform.top - 1 - PLAYER_HEIGHT
+                        in_air = False
+                        dy = 0
+                    x += push
+        #in the air the jump flag changes nothing until landing, and letting go of jump there costs nothing,
+        #so airborne states are kept as not holding a jump, which can do everything the held one can
+        return (x + dx, y + dy, vel_y, jumped and not in_air, in_air, phase)
+
+
+def check_level(filename, avoid_enemies=False, max_ticks=60 * TICK_RATE, phase_margin=3, resolution=4, phase_step=34,
+                max_states=MAX_STATES):
+    start = time.perf_counter()
+    model = LevelModel(levelfile.load(filename), avoid_enemies, phase_margin, resolution, phase_step)
+    apple_ticks = {}
+    exit_ticks = None
+    visited = {model.key(model.start())}
+    frontier = [(model.start(), model.key(model.start()))]
+    ticks = 0
+    searched = 0
+    exhausted = False
+    #each state is checked at the start of the next tick, like the simulation checks the player's rect
+    while frontier and ticks < max_ticks:
+        ticks += 1
+        next_frontier = []
+        reached = set()
+        for state, state_key in frontier:
+            touched, at_exit, dead = model.contacts(state[0], state[1])
+            for index in touched:
+                apple_ticks.setdefault(model.apples[index][0], ticks)
+            #reaching the exit wins even if a hazard is touched on the same tick
+            if at_exit:
+                if exit_ticks is None:
+                    exit_ticks = ticks
+                continue
+            if dead:
+                continue
+            for dx, jump in ACTIONS:
+                following = model.step(state, dx, jump)
+                if following in reached:
+                    continue
+                key = model.key(following)
+                #a state that stays in its bucket carries on, so riding a platform or waiting for one is not cut short,
+                #unless it is the same state again and the platforms' timing does not matter here
+                if key in visited and not (key == state_key and (following[:5] != state[:5] or key[5] != -1)):
+                    continue
+                visited.add(key)
+                reached.add(following)
+                next_frontier.append((following, key))
+        frontier = next_frontier
+        searched += len(frontier)
+        if searched > max_states:
+            #out of budget, so whatever was not found yet may still be reachable
+            exhausted = True
+            break
+        #nothing left to find once the exit and every apple have been reached
+        if exit_ticks is not None and len(apple_ticks) == len(model.apples):
+            break
+    return {
+        'file': filename,
+        'exit_ticks': exit_ticks,
+        'apples': len(model.apples),
+        'apple_ticks': apple_ticks,
+        'unreachable_apples': sorted(position for position, _ in model.apples if position not in apple_ticks),
+        'states': searched,
+        'inconclusive': exhausted,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def print_report(results):
+    #an exit or apple that was not found is "NO" when the search ran out of states and "?" when it ran out of budget
+    #merged states can hide a quicker run, so the ticks to finish are only an upper bound
+    print(f'{"level":<14} {"exit":>6} {"<=ticks":>7} {"<=time s":>8} {"apples":>7} {"states":>9} {"check s":>8}')
+    for result in results:
+        exit_ticks = result['exit_ticks']
+        missing = '?' if result['inconclusive'] else 'NO'
+        apples = f'{result["apples"] - len(result["unreachable_apples"])}/{result["apples"]}'
+        print(f'{result["file"]:<14} {"yes" if exit_ticks is not None else missing:>6} '
+              f'{exit_ticks if exit_ticks is not None else "-":>7} '
+              f'{exit_ticks / TICK_RATE if exit_ticks is not None else 0:>8.2f} '
+              f'{apples:>7} {result["states"]:>9,} {result["seconds"]:>8.2f}')
+        if result['unreachable_apples']:
+            print(f'{"":<14} apples not found (col, row): {result["unreachable_apples"]}')
+        if result['inconclusive']:
+            print(f'{"":<14} inconclusive: stopped after {result["states"]:,} states (--max-states)')
+    print('<=ticks and <=time s are upper bounds on the fastest finish: states within --resolution px and '
+          '--phase-step ticks of each other are merged')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that levels can be finished and every apple collected')
+    parser.add_argument('files', nargs='*', help='level files (default: every level{N}.lvl)')
+    parser.add_argument('--workers', type=int, default=None, help='processes to check levels on')
+    parser.add_argument('--avoid-enemies', action='store_true', help='treat the whole stretch enemies patrol as deadly')
+    parser.add_argument('--max-ticks', type=int, default=60 * TICK_RATE, help='longest run searched')
+    parser.add_argument('--phase-margin', type=int, default=3,
+                        help='tiles around the platform paths where states are kept apart by platform phase')
+    parser.add_argument('--resolution', type=int, default=4,
+                        help=f'px steps states are told apart by (at most {SPEED}, the walking speed)')
+    parser.add_argument('--phase-step', type=int, default=34, help='ticks of platform phase states are told apart by')
+    parser.add_argument('--max-states', type=int, default=MAX_STATES,
+                        help='states searched per level before it is reported as inconclusive')
+    args = parser.parse_args()
+    if not 1 <= args.resolution <= SPEED:
+        parser.error(f'--resolution must be between 1 and {SPEED}')
+    files = args.files or sorted(glob('level*.lvl'), key=lambda name: int(name[5:-4]))
+
+    count = len(files)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(check_level, files, [args.avoid_enemies] * count, [args.max_ticks] * count,
+                                [args.phase_margin] * count, [args.resolution] * count, [args.phase_step] * count,
+                                [args.max_states] * count))
+    print_report(results)
+    #1 if something was not found, 2 if the search for it was also cut short
+    if all(result['exit_ticks'] is not None and not result['unreachable_apples'] for result in results):
+        sys.exit(0)
+    sys.exit(2 if any(result['inconclusive'] for result in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""
+levelfile.py: Compact binary level format.
+A level file is a fixed 16 byte header, the tile grid as one uint8 per cell
+in row-major order, and an optional table of per-entity parameters:
+
+    header  '<4sHHHHI'  magic b'PLVL', version, cols, rows, flags, param count
+    grid    cols * rows bytes
+    params  param count records of '<HHi' (col, row, value)
+
+load() memory-maps the file and the grid rows are memoryview slices of the
+mapping, so nothing is copied or parsed. Run this file to convert the old
+pickled level{N}_data files to level{N}.lvl.
+"""
+
+import mmap
+import pickle
+import struct
+import sys
+from glob import glob
+from os import fstat, path
+
+
+MAGIC = b'PLVL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHI')
+PARAM = struct.Struct('<HHi')
+
+
+class LevelFormatError(ValueError):
+    pass
+
+
+class Level():
+    def __init__(self, cols, rows, grid, params=None) -> None:
+        self.cols = cols
+        self.rows = rows
+        #flat uint8 buffer (bytes, bytearray, mmap or memoryview) of cols * rows tiles
+        self.grid = memoryview(grid).cast('B')
+        self.params = params if params is not None else {}
+        if len(self.grid) != cols * rows:
+            raise LevelFormatError(f'grid has {len(self.grid)} cells, expected {cols * rows}')
+
+    #rows can be indexed and iterated like the old nested lists
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        return self.grid[row * self.cols:(row + 1) * self.cols]
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+    def get(self, col, row):
+        return self.grid[row * self.cols + col]
+
+    def to_lists(self):
+        return [list(row) for row in self]
+
+    def as_array(self):
+        #zero-copy (rows, cols) numpy view of the grid
+        import numpy as np
+        return np.frombuffer(self.grid, dtype=np.uint8).reshape(self.rows, self.cols)
+
+
+def from_lists(data, params=None):
+    rows = len(data)
+    cols = len(data[0]) if rows else 0
+    grid = bytearray()
+    for row in data:
+        if len(row) != cols:
+            raise LevelFormatError('level rows have different lengths')
+        grid.extend(row)
+    return Level(cols, rows, grid, params)
+
+
+def parse(buffer):
+    view = memoryview(buffer).cast('B')
+    if len(view) < HEADER.size:
+        raise LevelFormatError('file too short for a level header')
+    magic, version, cols, rows, flags, param_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise LevelFormatError('not a level file')
+    if version > VERSION:
+        raise LevelFormatError(f'level format version {version} is newer than supported ({VERSION})')
+    grid_end = HEADER.size + cols * rows
+    if len(view) < grid_end + param_count * PARAM.size:
+        raise LevelFormatError('level file is truncated')
+    params = {}
+    for offset in range(grid_end, grid_end + param_count * PARAM.size, PARAM.size):
+        col, row, value = PARAM.unpack_from(view, offset)
+        params[(col, row)] = value
+    return Level(cols, rows, view[HEADER.size:grid_end], params)
+
+
+def load(filename):
+    with open(filename, 'rb') as level_file:
+        #an empty file cannot be mapped, and anything shorter than a header is rejected by parse() anyway
+        if fstat(level_file.fileno()).st_size < HEADER.size:
+            return parse(level_file.read())
+        mapping = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+    #the level's memoryviews keep the mapping alive
+    return parse(mapping)
+
+
+def dumps(level):
+    if not isinstance(level, Level):
+        level = from_lists(level)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, level.cols, level.rows, 0, len(level.params)))
+    out += level.grid
+    for (col, row), value in sorted(level.params.items()):
+        out += PARAM.pack(col, row, value)
+    return bytes(out)
+
+
+def save(filename, level):
+    data = dumps(level)
+    with open(filename, 'wb') as level_file:
+        level_file.write(data)
+
+
+def level_filename(level):
+    return f'level{level}.lvl'
+
+
+class _LevelUnpickler(pickle.Unpickler):
+    #old level files only hold nested lists of ints, so refuse anything else
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f'{module}.{name} is not allowed in a level file')
+
+
+def convert(filename):
+    #convert a pickled level{N}_data file to level{N}.lvl next to it
+    with open(filename, 'rb') as pickle_in:
+        data = _LevelUnpickler(pickle_in).load()
+    level = from_lists(data)
+    out = path.join(path.dirname(filename), path.basename(filename).replace('_data', '') + '.lvl')
+    save(out, level)
+    return out
+
+
+def main():
+    filenames = sys.argv[1:] or sorted(glob('level*_data'))
+    for filename in filenames:
+        print(f'{filename} -> {convert(filename)}')
+
+
+if __name__ == '__main__':
+    main()
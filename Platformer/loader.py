@@ -0,0 +1,47 @@
+"""
+loader.py: Background loading of upcoming levels.
+LevelLoader reads and parses the next level's file on a worker thread while
+the current level is being played, so the swap at the exit does no file IO.
+The World itself (sprites, their frames and the baked static layer) is built
+from that data when the level is taken, on the game's thread, because
+pygame surfaces are not safe to load or convert off the main thread.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+import levelfile
+
+
+class LevelLoader():
+    def __init__(self, load, build, prepare=None) -> None:
+        #load(level) returns the level's plain data and runs on the worker,
+        #build(data) returns a World and prepare(level, world) finishes it off (e.g. bakes the static layer) when taken
+        self.load = load
+        self.build = build
+        self.prepare = prepare
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-loader')
+        self.pending = {}
+
+    def prefetch(self, level):
+        if level in self.pending or not path.exists(levelfile.level_filename(level)):
+            return
+        self.pending[level] = self.executor.submit(self.load, level)
+
+    def take(self, level):
+        #the World for the prefetched level, waiting for its data if still loading, or None
+        future = self.pending.pop(level, None)
+        if future is None:
+            return None
+        world = self.build(future.result())
+        if self.prepare is not None:
+            self.prepare(level, world)
+        return world
+
+    def cancel(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=True)
@@ -5,6 +5,11 @@ platformer.py: Basic platformer with some animations, music, and sound effects.
 Made following the tutorial provided by Coding with Russ (codingwithruss.com),
 altered to fit the open-source graphics chosen, with some additional functionality,
 such as enemy/item/platform animations, and changing backgrounds.
+Importing this module has no side effects: Game opens the window, loads the
+assets and builds the first level when it is started, and loads fonts and
+sounds the first time they are needed. Run it with --startup to draw one
+frame and print how long each startup step took, e.g. together with
+python -X importtime.
 """
 
 __author__  = "Kevin Kastner"
@@ -16,103 +21,68 @@ __maintainer__ = "Kevin Kastner"
 __email__ = "kkastner@alumni.nd.edu"
 __status__ = "Prototype"
 
-import pygame
-from pygame.locals import *
-from pygame import mixer
+from time import perf_counter, strftime
+#time to first frame is measured from here
+launch_time = perf_counter()
+import sys
 import math
-import pickle
-from os import path
-from random import randint
-import spritesheet
-
+import pygame
+from camera import Camera, ChunkedTileMap, draw_group
+from loader import LevelLoader
+from pool import pool
+from assets import cache
+from audio import AudioManager
+from bundle import BundleError, BACKGROUNDS, BUTTONS, build as build_bundle, install as install_bundle
+from profiler import FrameProfiler
+from render import DirtyRenderer, FrameStats
+from replay import Recorder, save as save_recording
+from text import GlyphAtlas, TextCache
+from simulation import Simulation, World, Inputs, load_level_data, TICK_RATE, STARTING_LEVEL, tile_size
 
-pygame.mixer.pre_init(44100, -16, 2, 512)
-mixer.init()
-pygame.init()
 
-clock = pygame.time.Clock()
 fps = 60
 
 SCREEN_WIDTH = 960
 SCREEN_HEIGHT = 960
-STARTING_LEVEL = 1
-MAX_LEVEL = 11
-
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Platformer")
-
-#define font
-font = pygame.font.SysFont('Bauhaus 93', 70)
-font_score = pygame.font.SysFont('Bauhaus 93', 30)
-
-#define game variables
-tile_size = 32
-game_over = 0
-main_menu = True
-level = STARTING_LEVEL
-max_levels = MAX_LEVEL
-score = 0
+STATIC_LAYER = True
+DIRTY_RECTS = False
+#update enemies and platforms as numpy arrays (needs numpy)
+ENTITY_ARRAYS = False
+#swept collision with moving platforms, which cannot miss a contact at any speed (levelcheck.py models the default checks)
+SWEPT_PLATFORMS = False
+#load the next level on a worker thread while the current one is played
+PREFETCH_LEVELS = True
+#scrolling camera for levels larger than the screen
+CAMERA = False
+#slice animation frames into shared atlas pages instead of one surface per frame
+TEXTURE_ATLAS = True
+#draw the score from pre-rendered glyphs (antialiased edges of neighbouring glyphs can differ slightly from a whole string)
+GLYPH_SCORE = False
+#the camera draws the level in chunks, so it replaces the static layer and dirty rects
+if CAMERA:
+    STATIC_LAYER = DIRTY_RECTS = False
+#file to record the seed and inputs of the run to, for replay.py (e.g. 'run.rpl')
+RECORD_FILE = None
+#seed of the enemies' idle schedules, to play a run again (None picks one, which is printed on exit)
+SEED = None
+#precompiled frames and images to start from instead of decoding the PNGs (None to always decode)
+ASSET_BUNDLE = 'assets.bundle'
+#play music and sound effects (False for a silent run that never starts the mixer)
+AUDIO = True
+#most simulation ticks run in one frame before the backlog is dropped
+MAX_CATCH_UP = 5
 
 #define colors
 black = (0, 0, 0)
 white = (255, 255, 255)
 blue = (0, 0, 255)
 
-#load images
-bg_img = [None for _ in range(7)]
-bg_img[1] = pygame.image.load("img/Pixel Adventure/Background/Blue.png")
-bg_img[2] = pygame.image.load("img/Pixel Adventure/Background/Brown.png")
-bg_img[3] = pygame.image.load("img/Pixel Adventure/Background/Gray.png")
-bg_img[4] = pygame.image.load("img/Pixel Adventure/Background/Green.png")
-bg_img[5] = pygame.image.load("img/Pixel Adventure/Background/Pink.png")
-bg_img[6] = pygame.image.load("img/Pixel Adventure/Background/Purple.png")
-bg_img[0] = pygame.image.load("img/Pixel Adventure/Background/Yellow.png")
-restart_img = pygame.image.load("img/Pixel Adventure/Menu/Buttons/Restart.png")
-start_img = pygame.image.load("img/Pixel Adventure/Menu/Buttons/Play.png")
-exit_img = pygame.image.load("img/Pixel Adventure/Menu/Buttons/Close.png")
-
-#load sounds
-pygame.mixer.music.load('sounds/ngini-ija.mp3')
-pygame.mixer.music.play(-1, 0.0, 0)
-apple_fx = pygame.mixer.Sound('sounds/apple-bite.mp3')
-apple_fx.set_volume(0.3)
-jump_fx = pygame.mixer.Sound('sounds/jump.mp3')
-jump_fx.set_volume(0.2)
-game_over_fx = pygame.mixer.Sound('sounds/game-over.mp3')
 
 #function to draw background using tile image
-def populateBackground(img, img_size):
-    numWidthTiles = math.ceil(SCREEN_WIDTH / img_size)
-    numHeightTiles = math.ceil(SCREEN_HEIGHT / img_size)
-    for i in range(numHeightTiles):
-        for j in range(numWidthTiles):
-            screen.blit(img, (j * img_size, i * img_size))
-
-#function to draw text onto screen
-def draw_text(text, font, text_color, x, y):
-    img = font.render(text, True, text_color)
-    screen.blit(img, (x, y))
-
-#function to reset level
-def reset_level(level):
-    player.reset(player_x, player_y)
-    enemy_group.empty()
-    platform_group.empty()
-    spikes_group.empty()
-    apple_group.empty()
-    exit_group.empty()
-
-    #create dummy apple for showing the score
-    score_apple = Apple(tile_size // 2, tile_size // 2)
-    apple_group.add(score_apple)
-
-    #load in level data
-    if path.exists(f'level{level}_data'):
-        pickle_in = open(f'level{level}_data', 'rb')
-        world_data = pickle.load(pickle_in)
-    world = World(world_data)
-
-    return world
+def populateBackground(img, img_size, surface):
+    numWidthTiles = math.ceil(surface.get_width() / img_size)
+    numHeightTiles = math.ceil(surface.get_height() / img_size)
+    surface.blits([(img, (j * img_size, i * img_size)) for i in range(numHeightTiles) for j in range(numWidthTiles)], False)
 
 
 class Button():
@@ -124,7 +94,7 @@ class Button():
         self.rect.y = y
         self.clicked = False
 
-    def draw(self):
+    def draw(self, surface):
         action = False
 
         #get mouse position
@@ -140,499 +110,319 @@ class Button():
             self.clicked = False
 
         #draw button
-        screen.blit(self.image, self.rect)
+        surface.blit(self.image, self.rect)
 
         return action
 
-class Player():
-    def __init__(self, x, y) -> None:
-        self.reset(x, y)
-    
-    def reset(self, x, y):
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Main Characters/Pink Man/Idle (32x32).png").convert_alpha()
-        sprite_sheet_idle = spritesheet.SpriteSheet(sprite_sheet_image)
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Main Characters/Pink Man/Run (32x32).png").convert_alpha()
-        sprite_sheet_running = spritesheet.SpriteSheet(sprite_sheet_image)
-        sprite_sheet_image = pygame.image.load("img/Ghost/ghost-Sheet.png").convert_alpha()
-        sprite_sheet_dead = spritesheet.SpriteSheet(sprite_sheet_image)
-        #create animation list
-        self.images_right = []
-        self.images_left = []
-        animation_steps = [11, 12, 4]
-        self.action = 0
-        self.index = 0
-        self.counter = 0
-        scale = 1
-        width = 32
-        height = 32
-        self.x_offset = 6
-        self.y_offset = 6
-
-        for i, animation in enumerate(animation_steps):
-            tmp_img_right = []
-            tmp_img_left = []
-            for step_counter in range(animation):
-                if i == 0:
-                    img_right = sprite_sheet_idle.get_image(step_counter, width, height, scale, black)
-                elif i == 1:
-                    img_right = sprite_sheet_running.get_image(step_counter, width, height, scale, black)
-                elif i == 2:
-                    img_right = sprite_sheet_dead.get_image(step_counter, width, height, scale, black)
-                else:
-                    #bad data entered
-                    break
-                img_left = spritesheet.SpriteSheet.get_x_flipped_image(img_right, black)
-                tmp_img_right.append(img_right)
-                tmp_img_left.append(img_left)
-            self.images_right.append(tmp_img_right)
-            self.images_left.append(tmp_img_left)
-        self.image = self.images_right[self.action][self.index]
-        self.rect = self.image.get_rect()
-        self.rect.update(x + self.x_offset, y + self.y_offset, width - (2 * self.x_offset), height - self.y_offset)
-        self.width = width - (2 * self.x_offset)
-        self.height = height - self.y_offset
-        self.vel_y = 0
-        self.jumped = False
-        self.direction = 1
-        self.in_air = True
-        
-
-    def update(self, game_over):
-        dx, dy = 0, 0
-        animation_cooldown = 5
-        col_thresh = 20
-        moved = False
-
-        if game_over == 0:
-            #get keypresses
-            key = pygame.key.get_pressed()
-            if key[pygame.K_SPACE] and not self.jumped and not self.in_air:
-                jump_fx.play()
-                self.vel_y = -15
-                self.jumped = True
-                moved = True
-            if not key[pygame.K_SPACE]:
-                self.jumped = False
-            if key[pygame.K_LEFT]:
-                dx -= 5
-                self.direction = -1
-                moved = True
-            if key[pygame.K_RIGHT]:
-                dx += 5
-                self.direction = 1
-                moved = True
-            if moved:
-                if self.action != 1:
-                    self.index = 0
-                    self.counter = 0
-                self.action = 1
-            else:
-                if self.action != 0:
-                    self.index = 0
-                    self.counter = 0
-                self.action = 0
-
-            #add gravity
-            self.vel_y += 1
-            if self.vel_y > 10:
-                self.vel_y = 10
-            dy += self.vel_y
-
-            #check for collision
-            self.in_air = True
-            for tile in world.tile_list:
-                #check for collision in x direction
-                if tile[1].colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
-                    dx = 0
-
-                #check for collision in y direction
-                if tile[1].colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
-                    #check if below the ground, i.e. jumping into block
-                    if self.vel_y < 0:
-                        dy = tile[1].bottom - self.rect.top
-                        self.vel_y = 0
-                    #check if above the ground, i.e. falling on a block
-                    elif self.vel_y >= 0:
-                        dy = tile[1].top - self.rect.bottom
-                        self.in_air = False
-
-            #check for collision with enemies
-            if pygame.sprite.spritecollide(self, enemy_group, False):
-                game_over = -1
-                game_over_fx.play()
-                self.died_y = self.rect.y
-            
-            #check for collision with spikes
-            if pygame.sprite.spritecollide(self, spikes_group, False):
-                game_over = -1
-                game_over_fx.play()
-                self.died_y = self.rect.y
-
-            #check for collision with exit
-            if pygame.sprite.spritecollide(self, exit_group, False):
-                game_over = 1
-
-            #check for collision with platforms
-            for platform in platform_group:
-                #collision in the x direction
-                if platform.rect.colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
-                    dx = 0
-
-                #collision in the y direction
-                if platform.rect.colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
-                    #check if below platform
-                    if abs((self.rect.top + dy) - platform.rect.bottom) < col_thresh:
-                        self.vel_y = 0
-                        dy = platform.rect.bottom - self.rect.top
-                    #check if above platform
-                    elif abs((self.rect.bottom + dy) - platform.rect.top) < col_thresh:
-                        self.rect.bottom = platform.rect.top - 1
-                        self.in_air = False
-                        dy = 0
-                    #move sideways with the platform
-                    if platform.move_x != 0:
-                        self.rect.x += platform.move_direction * platform.move_x
-
-            #update player coordinates
-            self.rect.x += dx
-            self.rect.y += dy
-
-        elif game_over == -1:
-            self.action = 2
-            draw_text('GAME OVER!', font, blue, (SCREEN_WIDTH // 2) - 200, (SCREEN_HEIGHT // 2) - 16)
-            if self.died_y - self.rect.y < 200:
-                self.rect.y -= 5
-            else:
-                self.counter = 0
-
-        #handle animation
-        self.counter += 1
-        if self.counter > animation_cooldown:
-            self.counter = 0
-            self.index += 1
-            if self.index >= len(self.images_right[self.action]):
-                self.index = 0
-            if self.direction == 1:
-                self.image = self.images_right[self.action][self.index]
-            if self.direction == -1:
-                self.image = self.images_left[self.action][self.index]
-
-        #draw player onto screen
-        screen.blit(self.image, (self.rect.x - self.x_offset, self.rect.y - self.y_offset))
-        #pygame.draw.rect(screen, (255, 255, 255), self.rect, 2) #see rectangle outline
-
-        return game_over
-
-class World():
-    def __init__(self, data) -> None:
-        self.tile_list = []
-
-        #load images
-        dirt_img = pygame.image.load('img/Platform Tiles/dirt_32x32.png')
-        grass_img = pygame.image.load('img/Platform Tiles/grass_32x32.png')
-
-        for row_count, row in enumerate(data):
-            for col_count, tile in enumerate(row):
-                x, y = col_count * tile_size, row_count * tile_size
-                if tile == 1:
-                    img = pygame.transform.scale(dirt_img, (tile_size, tile_size))
-                    img_rect = img.get_rect()
-                    img_rect.x = x
-                    img_rect.y = y
-                    tile = (img, img_rect)
-                    self.tile_list.append(tile)
-                if tile == 2:
-                    img = pygame.transform.scale(grass_img, (tile_size, tile_size))
-                    img_rect = img.get_rect()
-                    img_rect.x = x
-                    img_rect.y = y
-                    tile = (img, img_rect)
-                    self.tile_list.append(tile)
-                if tile == 3:
-                    enemy = Enemy(x, y)
-                    enemy_group.add(enemy)
-                if tile == 4:
-                    platform = Platform(x, y, 1, 0)
-                    platform_group.add(platform)
-                if tile == 5:
-                    platform = Platform(x, y, 0, 1)
-                    platform_group.add(platform)
-                if tile == 6:
-                    spikes = Spikes(col_count * tile_size, row_count * tile_size + (tile_size // 2))
-                    spikes_group.add(spikes)
-                if tile == 7:
-                    apple = Apple(col_count * tile_size + (tile_size // 2), row_count * tile_size + (tile_size // 2))
-                    apple_group.add(apple)
-                if tile == 8:
-                    exit = Exit(x, y)
-                    exit_group.add(exit)
 
-    def draw(self):
-        for tile in self.tile_list:
-            screen.blit(tile[0], tile[1])
-            #pygame.draw.rect(screen, (255, 255, 255), tile[1], 2) #see rectangle outline
-
-
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y) -> None:
-        pygame.sprite.Sprite.__init__(self)
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Enemies/Rocks/Rock2_Idle (32x28).png").convert_alpha()
-        sprite_sheet_idle = spritesheet.SpriteSheet(sprite_sheet_image)
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Enemies/Rocks/Rock2_Run (32x28).png").convert_alpha()
-        sprite_sheet_running = spritesheet.SpriteSheet(sprite_sheet_image)
-        #create animation list
-        self.images_right = []
-        self.images_left = []
-        animation_steps = [13, 14]
-        self.action = 1
-        self.index = 0
-        self.counter = 0
-        scale = 1
-        width = 32
-        height = 32
-        self.x_offset = 0
-        self.y_offset = 10
-        self.idle_time = 0
-
-        for i, animation in enumerate(animation_steps):
-            tmp_img_right = []
-            tmp_img_left = []
-            for step_counter in range(animation):
-                if i == 0:
-                    img_right = sprite_sheet_idle.get_image(step_counter, width, height, scale, black)
-                elif i == 1:
-                    img_right = sprite_sheet_running.get_image(step_counter, width, height, scale, black)
-                #elif i == 2:
-                #    img_right = sprite_sheet_dead.get_image(step_counter, width, height, scale, black)
-                else:
-                    #bad data entered
-                    break
-                img_left = spritesheet.SpriteSheet.get_x_flipped_image(img_right, black)
-                tmp_img_right.append(img_right)
-                tmp_img_left.append(img_left)
-            self.images_right.append(tmp_img_right)
-            self.images_left.append(tmp_img_left)
-        self.image = self.images_right[self.action][self.index]
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.move_direction = 1
-        self.move_counter = 0
+class Game():
+    def __init__(self) -> None:
+        #nothing is initialised until start(), so the game can be imported and set up without a window
+        self.screen = None
+        self.sim = None
+        self.clock = pygame.time.Clock()
+        self.fonts = {}
+        self.text_cache = TextCache()
+        self.score_glyphs = None
+        self.audio = AudioManager(AUDIO)
+        #sounds played for the events returned by the simulation, decoded once the first frame is up
+        self.audio.register('apple', 'sounds/apple-bite.mp3', 0.3, priority=1)
+        self.audio.register('jump', 'sounds/jump.mp3', 0.2, priority=0)
+        self.audio.register('game_over', 'sounds/game-over.mp3', 1.0, priority=2)
+        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.tilemap = None
+        self.renderer = None
+        self.loader = None
+        self.recorder = None
+        self.frame_stats = FrameStats('dirty rects' if DIRTY_RECTS else 'full redraw')
+        #per-phase timings, F3 toggles the overlay and F4 dumps them to CSV
+        self.profiler = FrameProfiler()
+        self.transition_stats = FrameStats('level transitions' + (' (prefetched)' if PREFETCH_LEVELS else ''), unit='transitions')
+        #(step, seconds) for each part of startup, beginning with the imports
+        self.startup = [('imports', perf_counter() - launch_time)]
+        self.first_frame = None
+        self.main_menu = True
+        self.accumulator = 0
+        self.dirty_rects = []
+        self.running = False
+
+    def timed(self, step, init):
+        start = perf_counter()
+        init()
+        self.startup.append((step, perf_counter() - start))
+
+    def start(self):
+        self.timed('display', self.init_display)
+        self.timed('assets', self.init_assets)
+        self.timed('level', self.init_level)
+
+    def init_display(self):
+        #the mixer is left to the audio manager, which only starts it once a sound is played
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Platformer")
+        self.renderer = DirtyRenderer(self.screen)
+
+    def init_assets(self):
+        if TEXTURE_ATLAS:
+            #384px pages hold every frame in the game on a single page
+            cache.enable_atlas(384)
+        if ASSET_BUNDLE:
+            try:
+                install_bundle(cache, ASSET_BUNDLE)
+            except BundleError as error:
+                #stale or missing, so decode everything once and write a fresh bundle for next time
+                print(f'rebuilding {ASSET_BUNDLE}: {error}')
+                try:
+                    build_bundle(cache, ASSET_BUNDLE)
+                except OSError as error:
+                    #the cache is filled before the bundle is written, so the game carries on without one
+                    print(f'cannot write {ASSET_BUNDLE}: {error}')
 
-    def update(self):
-        if self.idle_time > 0:
-            self.action = 0
-            self.idle_time -= 1
+        #load images
+        self.bg_img = [cache.get_image(filename) for filename in BACKGROUNDS]
+        #create buttons
+        self.restart_button = Button(SCREEN_WIDTH // 2 - 32, SCREEN_HEIGHT // 2 + 64, cache.get_image(BUTTONS['restart']), 2)
+        self.start_button = Button(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2, cache.get_image(BUTTONS['start']), 4)
+        self.exit_button = Button(SCREEN_WIDTH // 2 + 130, SCREEN_HEIGHT // 2, cache.get_image(BUTTONS['exit']), 6)
+
+    def init_level(self):
+        if PREFETCH_LEVELS:
+            self.loader = LevelLoader(load_level_data, World, self.bake_level if STATIC_LAYER or DIRTY_RECTS else None)
+        self.sim = Simulation(STARTING_LEVEL, entity_arrays=ENTITY_ARRAYS, loader=self.loader, seed=SEED, swept_platforms=SWEPT_PLATFORMS)
+        self.prepare_level()
+        self.recorder = Recorder(self.sim) if RECORD_FILE else None
+
+    def font(self, size):
+        #system fonts are looked up the first time each size is drawn, not at startup
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.SysFont('Bauhaus 93', size)
+        return self.fonts[size]
+
+    #function to draw text onto screen
+    def draw_text(self, text, font, text_color, x, y):
+        img = self.text_cache.render(font, text, text_color)
+        self.renderer.mark(self.screen.blit(img, (x, y)))
+
+    #function to draw the score and level counters
+    def draw_hud(self):
+        sim = self.sim
+        if GLYPH_SCORE:
+            if self.score_glyphs is None:
+                self.score_glyphs = GlyphAtlas(self.font(30), white, 'X 0123456789')
+            self.renderer.mark(self.score_glyphs.draw(self.screen, 'X ' + str(sim.score), tile_size - 5, 0))
         else:
-            self.action = 1
-            self.rect.x += self.move_direction
-            self.move_counter += 1
-            idle_time = randint(0, 500)
-            if idle_time >= 498:
-                self.idle_time = idle_time // 5
-        #handle animation
-        animation_cooldown = 5
-        self.counter += 1
-        if self.counter > animation_cooldown:
-            self.counter = 0
-            self.index += 1
-            if self.index >= len(self.images_right[self.action]):
-                self.index = 0
-            if self.move_direction == -1:
-                self.image = self.images_right[self.action][self.index]
-            if self.move_direction == 1:
-                self.image = self.images_left[self.action][self.index]
-        if abs(self.move_counter) > 50:
-            self.move_direction *= -1
-            self.move_counter *= -1
-        #pygame.draw.rect(screen, (255, 255, 255), self.rect, 2) #see rectangle outline
-
-class Platform(pygame.sprite.Sprite):
-    def __init__(self, x, y, move_x, move_y) -> None:
-        pygame.sprite.Sprite.__init__(self)
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Traps/Falling Platforms/On (32x10).png").convert_alpha()
-        sprite_sheet = spritesheet.SpriteSheet(sprite_sheet_image)
-        #create animation list
-        self.images = []
-        animation_steps = 4
-        self.index = 0
-        self.counter = 0
-        scale = 1
-        width = 32
-        height = 10
-
-        for step_counter in range(animation_steps):
-            img = sprite_sheet.get_image(step_counter, width, height, scale, black)
-            self.images.append(img)
-        self.image = self.images[self.index]
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.move_direction = 1
-        self.move_counter = 0
-        self.move_x = move_x
-        self.move_y = move_y
+            self.draw_text('X ' + str(sim.score), self.font(30), white, tile_size - 5, 0)
+        self.draw_text('Level ' + str(sim.level), self.font(30), white, tile_size * 14, 0)
 
-    def update(self):
-        self.rect.x += self.move_direction * self.move_x
-        self.rect.y += self.move_direction * self.move_y
-        self.move_counter += 1
-        if abs(self.move_counter) > 50:
-            self.move_direction *= -1
-            self.move_counter *= -1
-        #handle animation
-        animation_cooldown = 5
-        self.counter += 1
-        if self.counter > animation_cooldown:
-            self.counter = 0
-            self.index += 1
-            if self.index >= len(self.images):
-                self.index = 0
-            self.image = self.images[self.index]
-
-class Spikes(pygame.sprite.Sprite):
-    def __init__(self, x, y) -> None:
-        pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load("img/Pixel Adventure/Traps/Spikes/Idle.png")
-        self.image = pygame.transform.scale(self.image, (tile_size, tile_size // 2))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+    def draw_button(self, button):
+        action = button.draw(self.screen)
+        self.renderer.mark(button.rect)
+        return action
 
-class Apple(pygame.sprite.Sprite):
-    def __init__(self, x, y) -> None:
-        pygame.sprite.Sprite.__init__(self)
-        sprite_sheet_image = pygame.image.load("img/Pixel Adventure/Items/Fruits/Apple.png").convert_alpha()
-        sprite_sheet = spritesheet.SpriteSheet(sprite_sheet_image)
-        #create animation list
-        self.images = []
-        animation_steps = 17
-        self.index = 0
-        self.counter = 0
-        scale = 1
-        width = 32
-        height = 32
-
-        for step_counter in range(animation_steps):
-            img = sprite_sheet.get_image(step_counter, width, height, scale, black)
-            self.images.append(img)
-        self.image = self.images[self.index]
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
+    #function to bake the background and tiles of a level into its static layer
+    def bake_level(self, level, world):
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        populateBackground(self.bg_img[level % 7], 64, background)
+        world.bake(background)
+
+    #function to prepare the current level for drawing
+    def prepare_level(self):
+        sim = self.sim
+        world = sim.world
+        if CAMERA:
+            self.tilemap = ChunkedTileMap(world, self.bg_img[sim.level % 7], 64)
+            self.camera.set_bounds(world.tile_grid.cols * tile_size, world.tile_grid.rows * tile_size)
+        #prefetched levels are already baked
+        if (STATIC_LAYER or DIRTY_RECTS) and world.static_layer is None:
+            self.bake_level(sim.level, world)
+        if DIRTY_RECTS:
+            self.renderer.set_scene(world.static_layer, *world.sprite_groups())
+
+    #function to reset level
+    def reset_level(self, level):
+        self.sim.load_level(level)
+        self.prepare_level()
+
+    def menu_frame(self):
+        self.accumulator = 0
+        populateBackground(self.bg_img[self.sim.level % 7], 64, self.screen)
+        if self.draw_button(self.exit_button):
+            self.running = False
+        if self.draw_button(self.start_button):
+            self.main_menu = False
+            if DIRTY_RECTS:
+                self.renderer.active = True
+                self.renderer.invalidate()
+                self.dirty_rects = [self.screen.get_rect()]
 
     def update(self):
-        #handle animation
-        animation_cooldown = 5
-        self.counter += 1
-        if self.counter > animation_cooldown:
-            self.counter = 0
-            self.index += 1
-            if self.index >= len(self.images):
-                self.index = 0
-            self.image = self.images[self.index]
-        #pygame.draw.rect(screen, (255, 255, 255), self.rect, 2) #see rectangle outline
-
-class Exit(pygame.sprite.Sprite):
-    def __init__(self, x, y) -> None:
-        pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load("img/Pixel Adventure/Items/Checkpoints/End/End (Idle).png")
-        self.image = pygame.transform.scale(self.image, (tile_size, tile_size))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        #advance the simulation in fixed ticks, catching up after slow frames
+        sim, profiler, recorder = self.sim, self.profiler, self.recorder
+        tick_ms = 1000 / TICK_RATE
+        inputs = Inputs.from_keys(pygame.key.get_pressed())
+        #recordings are replayed without a camera, so they are made with every entity updating
+        if CAMERA and recorder is None:
+            #keep the level around the screen running, and leave the rest until it comes into view
+            sim.active_area = self.camera.view.inflate(2 * sim.world.chunk_size, 2 * sim.world.chunk_size)
+        steps = 0
+        while self.accumulator >= tick_ms and steps < MAX_CATCH_UP:
+            self.accumulator -= tick_ms
+            steps += 1
+            events = []
+            if recorder is not None:
+                recorder.tick(inputs)
+            start = perf_counter()
+            sim.update_entities(events)
+            now = perf_counter()
+            profiler.add('update', now - start)
+            sim.update_player(inputs, events)
+            profiler.add('collision', perf_counter() - now)
+            for event in events:
+                self.audio.play(event)
+            #if player has completed the level, go to the next one
+            if sim.game_over == 1:
+                self.transition_stats.begin()
+                if sim.next_level():
+                    self.prepare_level()
+                    self.transition_stats.end()
+        if steps == MAX_CATCH_UP:
+            self.accumulator = 0
 
-player_x, player_y = 100, SCREEN_HEIGHT - 64
-player = Player(player_x, player_y)
-
-enemy_group = pygame.sprite.Group()
-platform_group = pygame.sprite.Group()
-spikes_group = pygame.sprite.Group()
-apple_group = pygame.sprite.Group()
-exit_group = pygame.sprite.Group()
-
-#create dummy apple for showing the score
-score_apple = Apple(tile_size // 2, tile_size // 2)
-apple_group.add(score_apple)
-
-#load in level data
-if path.exists(f'level{level}_data'):
-    pickle_in = open(f'level{level}_data', 'rb')
-    world_data = pickle.load(pickle_in)
-world = World(world_data)
-
-
-#create buttons
-restart_button = Button(SCREEN_WIDTH // 2 - 32, SCREEN_HEIGHT // 2 + 64, restart_img, 2)
-start_button = Button(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2, start_img, 4)
-exit_button = Button(SCREEN_WIDTH // 2 + 130, SCREEN_HEIGHT // 2, exit_img, 6)
-
-run = True
-while run:
-
-    clock.tick(fps)
-
-    populateBackground(bg_img[level % 7], 64)
-
-    if main_menu:
-        if exit_button.draw():
-            run = False
-        if start_button.draw():
-            main_menu = False
-    else:
-        world.draw()
-
-        #player is playing the game
-        if game_over == 0:
-            enemy_group.update()
-            platform_group.update()
-            #update score
-            #check if an apple has been collected
-            if pygame.sprite.spritecollide(player, apple_group, True):
-                score += 1
-                apple_fx.play()
-            apple_group.update()
-        draw_text('X ' + str(score), font_score, white, tile_size - 5, 0)
-        draw_text('Level ' + str(level), font_score, white, tile_size * 14, 0)
-
-        enemy_group.draw(screen)
-        platform_group.draw(screen)
-        spikes_group.draw(screen)
-        apple_group.draw(screen)
-        exit_group.draw(screen)
-
-        game_over = player.update(game_over)
+    def draw(self):
+        #the background and tiles are restored by the dirty renderer, or redrawn in full
+        sim, screen, profiler, camera = self.sim, self.screen, self.profiler, self.camera
+        start = perf_counter()
+        sim.world.sync_sprites()
+        if CAMERA:
+            camera.follow(sim.player.rect)
+            self.tilemap.draw(screen, camera)
+            now = perf_counter()
+            profiler.add('background', now - start)
+            start = now
+            self.draw_hud()
+            for group in sim.world.sprite_groups():
+                draw_group(screen, sim.world, group, camera, skip=sim.score_apple)
+            #the score apple is part of the HUD, so it does not scroll
+            screen.blit(sim.score_apple.image, sim.score_apple.rect)
+        elif DIRTY_RECTS:
+            self.dirty_rects = self.renderer.draw()
+            self.draw_hud()
+        else:
+            #the baked static layer already contains the background
+            if sim.world.static_layer is None:
+                populateBackground(self.bg_img[sim.level % 7], 64, screen)
+            sim.world.draw(screen)
+            now = perf_counter()
+            profiler.add('background', now - start)
+            start = now
+            self.draw_hud()
+            for group in sim.world.sprite_groups():
+                group.draw(screen)
+
+        self.renderer.mark(sim.player.draw(screen, camera.offset))
+        profiler.add('draw', perf_counter() - start)
+
+    def game_frame(self):
+        sim = self.sim
+        self.update()
+        self.draw()
 
         #if player has died
-        if game_over == -1:
-            if restart_button.draw():
-                world_data = []
-                world = reset_level(level)
-                game_over = 0
-
-        #if player has completed the level
-        if game_over == 1:
-            #reset game and go to next level
-            level += 1
-            if level <= max_levels:
-                #reset level
-                world_data = []
-                world = reset_level(level)
-                game_over = 0
-            else:
-                draw_text('YOU WIN!', font, blue, (SCREEN_WIDTH // 2) - 152, (SCREEN_HEIGHT // 2) - 32)
-                level = max_levels
-                if restart_button.draw():
-                    #restart game
-                    level = STARTING_LEVEL
-                    world_data = []
-                    world = reset_level(level)
-                    game_over = 0
-
-    #event handler
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            run = False
-
-    pygame.display.update()
-
-pygame.quit()
\ No newline at end of file
+        if sim.game_over == -1:
+            self.draw_text('GAME OVER!', self.font(70), blue, (SCREEN_WIDTH // 2) - 200, (SCREEN_HEIGHT // 2) - 16)
+            if self.draw_button(self.restart_button):
+                self.reset_level(sim.level)
+                if self.recorder is not None:
+                    self.recorder.restart()
+
+        #if player has completed the last level
+        if sim.game_over == 1:
+            self.draw_text('YOU WIN!', self.font(70), blue, (SCREEN_WIDTH // 2) - 152, (SCREEN_HEIGHT // 2) - 32)
+            if self.draw_button(self.restart_button):
+                #restart game
+                self.reset_level(STARTING_LEVEL)
+                if self.recorder is not None:
+                    self.recorder.restart(game=True)
+
+    def handle_events(self):
+        #event handler
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
+                elif event.key == pygame.K_F4:
+                    print('frame profile written to', self.profiler.dump_csv(strftime('profile_%Y%m%d_%H%M%S.csv')))
+
+    def present(self):
+        if self.profiler.overlay:
+            self.renderer.mark(self.profiler.draw_overlay(self.screen))
+        start = perf_counter()
+        if self.renderer.active:
+            self.renderer.update(self.dirty_rects)
+        else:
+            pygame.display.update()
+        self.profiler.add('flip', perf_counter() - start)
+
+    def frame(self):
+        self.accumulator += self.clock.tick(fps)
+        self.frame_stats.begin()
+        self.profiler.begin_frame()
+        if self.main_menu:
+            self.menu_frame()
+        else:
+            self.game_frame()
+        self.handle_events()
+        self.present()
+        self.profiler.end_frame()
+        self.frame_stats.end()
+        if self.first_frame is None:
+            self.first_frame = perf_counter() - launch_time
+            #start the music and decode the effects once the window is up, rather than before it or on a first jump
+            start = perf_counter()
+            self.audio.play_music('sounds/ngini-ija.mp3')
+            self.audio.preload()
+            self.startup.append(('audio (after first frame)', perf_counter() - start))
+
+    def startup_report(self):
+        steps = ', '.join(f'{step} {seconds * 1000:.0f} ms' for step, seconds in self.startup)
+        first_frame = f'{self.first_frame * 1000:.0f} ms' if self.first_frame is not None else 'not drawn'
+        return f'startup: {steps}; first frame after {first_frame}' + (f' (asset bundle {ASSET_BUNDLE})' if ASSET_BUNDLE else '')
+
+    def run(self, frames=None):
+        #play until the window is closed, or for a number of frames
+        if self.screen is None:
+            self.start()
+        self.running = True
+        while self.running and frames != 0:
+            self.frame()
+            if frames is not None:
+                frames -= 1
+        self.finish()
+
+    def finish(self):
+        print(self.startup_report())
+        print(f'seed: {self.sim.seed} (level {self.sim.level} schedule {self.sim.level_seed})')
+        print(self.audio.summary())
+        print(pool.summary())
+        print(self.frame_stats.summary())
+        print(self.transition_stats.summary())
+        if self.recorder is not None:
+            save_recording(RECORD_FILE, self.recorder.finish(self.sim))
+            print(f'recorded {len(self.recorder.recording)} ticks to {RECORD_FILE}')
+        if self.loader is not None:
+            self.loader.shutdown()
+        pygame.quit()
+
+
+def main():
+    game = Game()
+    #--startup draws the first frame, reports how long getting there took and exits
+    game.run(1 if '--startup' in sys.argv[1:] else None)
+
+
+if __name__ == '__main__':
+    main()
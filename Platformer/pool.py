@@ -0,0 +1,68 @@
+"""
+pool.py: Per-type object pools for level entities.
+When a level is left or restarted its enemies, platforms, spikes, apples and
+exits are released to the pool instead of being dropped, and the next level
+takes them back and reinitializes them in place with their reset() method,
+so level loads and restarts construct almost no new sprites.
+"""
+
+import threading
+
+
+class SpritePool():
+    def __init__(self) -> None:
+        #class -> sprites waiting to be reused
+        self.free = {}
+        self.created = {}
+        self.reused = {}
+        self.released = {}
+        #safe to share between threads, like the asset cache
+        self.lock = threading.Lock()
+
+    def acquire(self, cls, *args):
+        #a released sprite of the class reset with the arguments, or a new one built with them
+        with self.lock:
+            free = self.free.get(cls)
+            sprite = free.pop() if free else None
+            counts = self.reused if sprite is not None else self.created
+            counts[cls] = counts.get(cls, 0) + 1
+        if sprite is None:
+            return cls(*args)
+        sprite.reset(*args)
+        return sprite
+
+    def release(self, sprites):
+        #take back sprites that are no longer in any group
+        with self.lock:
+            for sprite in sprites:
+                cls = type(sprite)
+                self.free.setdefault(cls, []).append(sprite)
+                self.released[cls] = self.released.get(cls, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            classes = set(self.created) | set(self.free)
+            return {cls.__name__: {
+                'created': self.created.get(cls, 0),
+                'reused': self.reused.get(cls, 0),
+                'released': self.released.get(cls, 0),
+                'free': len(self.free.get(cls, ())),
+            } for cls in classes}
+
+    def summary(self):
+        stats = self.stats()
+        created = sum(counts['created'] for counts in stats.values())
+        reused = sum(counts['reused'] for counts in stats.values())
+        return f'sprite pool: {created} created, {reused} reused, ' + ', '.join(
+            f'{name} {counts["free"]} free' for name, counts in sorted(stats.items()))
+
+    def clear(self):
+        with self.lock:
+            self.free.clear()
+            self.created.clear()
+            self.reused.clear()
+            self.released.clear()
+
+
+#shared pool used by every world in the game
+pool = SpritePool()
@@ -0,0 +1,124 @@
+"""
+profiler.py: Lightweight per-phase frame profiler.
+FrameProfiler records how long each phase of a frame took into fixed-size
+ring buffers (one array slot per frame, so recording allocates nothing),
+draws an optional on-screen overlay with a frame-time graph, and dumps the
+buffered frames to CSV. Phases are timed with add() on the hot path or with
+the span() context manager for custom timings.
+"""
+
+import csv
+import time
+from array import array
+from contextlib import contextmanager
+import pygame
+
+
+#colours of the phases in the overlay graph, custom spans get the fallback
+phase_colors = {
+    'background': (90, 90, 90),
+    'update': (80, 160, 255),
+    'collision': (255, 200, 60),
+    'draw': (80, 220, 120),
+    'flip': (230, 90, 90),
+}
+other_color = (200, 120, 255)
+
+
+class FrameProfiler():
+    def __init__(self, phases=('background', 'update', 'collision', 'draw', 'flip'), size=240) -> None:
+        self.size = size
+        self.phases = []
+        self.samples = {}
+        self.frame_times = array('d', bytes(8 * size))
+        self.current = {}
+        self.cursor = 0
+        self.count = 0
+        self.frame_start = None
+        self.overlay = False
+        self.font = None
+        for phase in phases:
+            self.add_phase(phase)
+
+    def add_phase(self, name):
+        if name not in self.samples:
+            self.phases.append(name)
+            self.samples[name] = array('d', bytes(8 * self.size))
+            self.current[name] = 0.0
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def add(self, name, seconds):
+        if name not in self.current:
+            self.add_phase(name)
+        self.current[name] += seconds
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        slot = self.cursor
+        self.frame_times[slot] = time.perf_counter() - self.frame_start
+        for name, seconds in self.current.items():
+            self.samples[name][slot] = seconds
+            self.current[name] = 0.0
+        self.cursor = (slot + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.frame_start = None
+
+    def slots(self):
+        #ring buffer slots from oldest to newest
+        start = (self.cursor - self.count) % self.size
+        return [(start + i) % self.size for i in range(self.count)]
+
+    def averages(self):
+        if not self.count:
+            return {}
+        slots = self.slots()
+        result = {name: sum(self.samples[name][i] for i in slots) / self.count for name in self.phases}
+        result['frame'] = sum(self.frame_times[i] for i in slots) / self.count
+        return result
+
+    def dump_csv(self, filename):
+        with open(filename, 'w', newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow(['frame', 'frame_ms'] + [name + '_ms' for name in self.phases])
+            for frame, slot in enumerate(self.slots()):
+                writer.writerow([frame, f'{self.frame_times[slot] * 1000:.4f}'] +
+                                [f'{self.samples[name][slot] * 1000:.4f}' for name in self.phases])
+        return filename
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+
+    def draw_overlay(self, surface, x=8, y=40, height=80, budget_ms=1000 / 60):
+        #stacked bar per frame, with a line at the frame budget
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        width = self.size
+        panel = pygame.Rect(x, y, width + 140, height + 8)
+        surface.fill((0, 0, 0), panel)
+        scale = height / (budget_ms * 2)
+        for column, slot in enumerate(self.slots()):
+            bottom = y + 4 + height
+            for name in self.phases:
+                bar = min(int(self.samples[name][slot] * 1000 * scale), bottom - y - 4)
+                if bar > 0:
+                    surface.fill(phase_colors.get(name, other_color), (x + column, bottom - bar, 1, bar))
+                    bottom -= bar
+        budget_y = y + 4 + height - int(budget_ms * scale)
+        pygame.draw.line(surface, (255, 255, 255), (x, budget_y), (x + width, budget_y))
+        text_y = y + 2
+        for name, seconds in self.averages().items():
+            color = (255, 255, 255) if name == 'frame' else phase_colors.get(name, other_color)
+            surface.blit(self.font.render(f'{name} {seconds * 1000:.2f} ms', True, color), (x + width + 6, text_y))
+            text_y += 12
+        return panel
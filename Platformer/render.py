@@ -0,0 +1,79 @@
+"""
+render.py: Dirty-rectangle renderer and frame-time statistics.
+DirtyRenderer keeps the level's sprites in a LayeredDirty group drawn over
+the baked static layer, so each frame only repaints and updates the parts of
+the screen that changed, instead of redrawing and flipping the whole window.
+"""
+
+import time
+import pygame
+
+
+class FrameStats():
+    def __init__(self, name, size=600, unit='frames') -> None:
+        self.name = name
+        self.size = size
+        self.unit = unit
+        self.times = []
+        self.start = None
+
+    def begin(self):
+        self.start = time.perf_counter()
+
+    def end(self):
+        if self.start is None:
+            return
+        self.times.append(time.perf_counter() - self.start)
+        if len(self.times) > self.size:
+            del self.times[0]
+        self.start = None
+
+    def percentile(self, pct):
+        if not self.times:
+            return 0.0
+        ordered = sorted(self.times)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+    def summary(self):
+        if not self.times:
+            return f'{self.name}: no {self.unit}'
+        mean = sum(self.times) / len(self.times)
+        return (f'{self.name}: {len(self.times)} {self.unit}, mean {mean * 1000:.2f} ms, '
+                f'p50 {self.percentile(50) * 1000:.2f} ms, p95 {self.percentile(95) * 1000:.2f} ms')
+
+
+class DirtyRenderer():
+    def __init__(self, screen) -> None:
+        self.screen = screen
+        self.group = pygame.sprite.LayeredDirty(_use_update=True)
+        #rects drawn straight onto the screen (player, text, buttons) this frame and last frame
+        self.overlays = []
+        self.last_overlays = []
+        self.active = False
+
+    def set_scene(self, background, *groups):
+        self.group.empty()
+        for group in groups:
+            self.group.add(*group.sprites())
+        self.group.clear(self.screen, background)
+        self.invalidate()
+
+    def invalidate(self):
+        #repaint the whole screen on the next frame
+        self.group.repaint_rect(self.screen.get_rect())
+        self.last_overlays = []
+
+    def mark(self, rect):
+        if self.active:
+            self.overlays.append(pygame.Rect(rect))
+
+    def draw(self):
+        #erase last frame's overlays, redrawing any sprites underneath them
+        for rect in self.last_overlays:
+            self.group.repaint_rect(rect)
+        return self.group.draw(self.screen)
+
+    def update(self, rects):
+        pygame.display.update(rects + self.overlays)
+        self.last_overlays = self.overlays
+        self.overlays = []
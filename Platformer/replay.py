@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+"""
+replay.py: Deterministic input recording and replay.
+A recording holds the simulation's RNG seed, its starting level and mode,
+the input of every tick, and the state the run ended in:
+
+    header  '<4sHIHHI'  magic b'PRPL', version, seed, starting level, flags, ticks
+    result  '<iiIHb'    final player x and y, score, level, game_over
+    inputs  '<BH' runs  input bits (left 1, right 2, jump 4, restart level 8,
+                        restart game 16) and how many ticks in a row they held
+
+Replaying feeds the inputs back through the simulation as fast as it runs and
+checks that it ends in the same state. Run this file with recordings to
+replay and verify them, e.g.
+
+    python Platformer/replay.py run.rpl
+"""
+
+import struct
+import sys
+import time
+from simulation import Simulation, Inputs, STARTING_LEVEL
+
+
+MAGIC = b'PRPL'
+VERSION = 2
+HEADER = struct.Struct('<4sHIHHI')
+RESULT = struct.Struct('<iiIHb')
+RUN = struct.Struct('<BH')
+
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+RESTART_LEVEL = 8
+RESTART_GAME = 16
+
+FLAG_ENTITY_ARRAYS = 1
+FLAG_SWEPT_PLATFORMS = 2
+
+
+class ReplayFormatError(ValueError):
+    pass
+
+
+def state(sim):
+    #what a replay has to reproduce
+    return (sim.player.rect.x, sim.player.rect.y, sim.score, sim.level, sim.game_over)
+
+
+class Recording():
+    def __init__(self, seed, level=STARTING_LEVEL, entity_arrays=False, inputs=None, result=None, swept_platforms=False) -> None:
+        self.seed = seed
+        self.level = level
+        self.entity_arrays = entity_arrays
+        self.swept_platforms = swept_platforms
+        #one byte of input bits per tick
+        self.inputs = inputs if inputs is not None else bytearray()
+        self.result = result
+
+    def __len__(self):
+        return len(self.inputs)
+
+
+class Recorder():
+    def __init__(self, sim) -> None:
+        self.recording = Recording(sim.seed, sim.level, sim.entity_arrays, swept_platforms=sim.swept_platforms)
+        self.pending = 0
+
+    def restart(self, game=False):
+        #applied before the next recorded tick, like the front end does
+        self.pending |= RESTART_GAME if game else RESTART_LEVEL
+
+    def tick(self, inputs):
+        self.recording.inputs.append(self.pending | LEFT * inputs.left | RIGHT * inputs.right | JUMP * inputs.jump)
+        self.pending = 0
+
+    def finish(self, sim):
+        self.recording.result = state(sim)
+        return self.recording
+
+
+def dumps(recording):
+    flags = (FLAG_ENTITY_ARRAYS if recording.entity_arrays else 0) | (FLAG_SWEPT_PLATFORMS if recording.swept_platforms else 0)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, recording.seed, recording.level, flags, len(recording.inputs)))
+    out += RESULT.pack(*(recording.result or (0, 0, 0, 0, 0)))
+    #inputs are held for many ticks at a time, so they are stored as runs
+    run_bits, run_length = None, 0
+    for bits in recording.inputs:
+        if bits == run_bits and run_length < 0xFFFF:
+            run_length += 1
+            continue
+        if run_length:
+            out += RUN.pack(run_bits, run_length)
+        run_bits, run_length = bits, 1
+    if run_length:
+        out += RUN.pack(run_bits, run_length)
+    return bytes(out)
+
+
+def parse(buffer):
+    if len(buffer) < HEADER.size + RESULT.size:
+        raise ReplayFormatError('file is too short for a recording header')
+    magic, version, seed, level, flags, ticks = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ReplayFormatError(f'bad magic {magic!r}')
+    if version != VERSION:
+        raise ReplayFormatError(f'unsupported version {version}')
+    result = RESULT.unpack_from(buffer, HEADER.size)
+    inputs = bytearray()
+    for bits, run_length in RUN.iter_unpack(buffer[HEADER.size + RESULT.size:]):
+        inputs += bytes([bits]) * run_length
+    if len(inputs) != ticks:
+        raise ReplayFormatError(f'inputs cover {len(inputs)} ticks, expected {ticks}')
+    return Recording(seed, level, bool(flags & FLAG_ENTITY_ARRAYS), inputs, result, bool(flags & FLAG_SWEPT_PLATFORMS))
+
+
+def save(filename, recording):
+    with open(filename, 'wb') as out:
+        out.write(dumps(recording))
+
+
+def load(filename):
+    with open(filename, 'rb') as src:
+        return parse(src.read())
+
+
+def replay(recording):
+    #run the recorded inputs through a fresh simulation without any frame cap, returns it
+    sim = Simulation(recording.level, entity_arrays=recording.entity_arrays, seed=recording.seed,
+                     swept_platforms=recording.swept_platforms)
+    for bits in recording.inputs:
+        if bits & RESTART_GAME:
+            sim.load_level(STARTING_LEVEL)
+        elif bits & RESTART_LEVEL:
+            sim.load_level(sim.level)
+        sim.step(Inputs(bool(bits & LEFT), bool(bits & RIGHT), bool(bits & JUMP)))
+        #the front end moves on as soon as a level is completed
+        if sim.game_over == 1:
+            sim.next_level()
+    return sim
+
+
+def verify(recording):
+    #replay and return whether the run ended in the recorded state, and the state it ended in
+    sim = replay(recording)
+    return state(sim) == tuple(recording.result), state(sim)
+
+
+def main():
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    failed = False
+    for filename in sys.argv[1:]:
+        recording = load(filename)
+        start = time.perf_counter()
+        ok, result = verify(recording)
+        elapsed = time.perf_counter() - start
+        print(f'{filename}: {len(recording)} ticks in {elapsed:.3f} s ({len(recording) / elapsed:,.0f} ticks/s), '
+              f'{"OK" if ok else "MISMATCH"} x={result[0]} y={result[1]} score={result[2]} level={result[3]}')
+        if not ok:
+            print(f'  expected x={recording.result[0]} y={recording.result[1]} score={recording.result[2]} level={recording.result[3]}')
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
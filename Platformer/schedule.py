@@ -0,0 +1,57 @@
+"""
+schedule.py: Seeded idle schedules for the enemies.
+A moving enemy used to roll randint(0, 500) every tick and stop to idle for
+roll // 5 ticks on a roll of 498 or more. IdleSchedule draws the same events
+directly, a batch at a time from a generator seeded per level: each event is
+how many moving ticks an enemy has left before it idles (geometric, with the
+old per-tick chance) and how long that idle lasts. Enemies count their
+moving ticks down to the next event, so the update loop makes no random
+calls, and a run's seed and level reproduce every enemy's timeline.
+"""
+
+import math
+import random
+
+
+#rolls of randint(0, 500) that stopped a moving enemy, for roll // 5 ticks
+IDLE_ROLLS = (498, 499, 500)
+IDLE_CHANCE = len(IDLE_ROLLS) / 501
+
+
+#function to derive the seed of a level's schedule from the seed of the run
+def level_seed(seed, level):
+    return random.Random(seed * 1000 + level).getrandbits(32)
+
+
+class IdleSchedule():
+    def __init__(self, seed, batch=256) -> None:
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch = batch
+        self.events = []
+        self.drawn = 0
+
+    def refill(self):
+        #draw a batch of (moving ticks before the idle, ticks the idle lasts) events in one go
+        rng = self.rng
+        scale = 1 / math.log(1 - IDLE_CHANCE)
+        self.events = [(int(math.log(1.0 - rng.random()) * scale) + 1, rng.choice(IDLE_ROLLS) // 5)
+                       for _ in range(self.batch)]
+        self.events.reverse()
+        self.drawn += self.batch
+
+    def next(self):
+        if not self.events:
+            self.refill()
+        return self.events.pop()
+
+    def take(self, count):
+        #the next count events, in the order next() would give them
+        while len(self.events) < count:
+            events = self.events
+            self.refill()
+            self.events += events
+        taken = self.events[-count:]
+        del self.events[-count:]
+        taken.reverse()
+        return taken
@@ -0,0 +1,767 @@
+#!/usr/bin/env python
+
+"""
+simulation.py: Headless game logic for the platformer.
+Simulation.step advances the game by one fixed tick from an Inputs value,
+without touching the display, audio or frame clock; sounds to play are
+returned as event names. platformer.py is the renderer on top of it, and
+tools, tests and bots can run it under the SDL dummy driver at full speed.
+"""
+
+import pygame
+from collections import namedtuple
+import random
+import levelfile
+from assets import cache
+from animation import AnimationClock
+from pool import pool
+from schedule import IdleSchedule, level_seed
+from collision import TileGrid, SpatialGrid, sweep
+try:
+    from entity_arrays import EntityArrays
+except ImportError:
+    #numpy is only needed for the struct-of-arrays entity mode
+    EntityArrays = None
+
+
+TICK_RATE = 60
+STARTING_LEVEL = 1
+MAX_LEVEL = 11
+
+tile_size = 32
+#tiles per side of the chunks used to cull updates and drawing on large levels
+CHUNK_TILES = 8
+#tiles per side of the broad-phase cells used for the player's overlap checks
+CONTACT_TILES = 2
+player_x, player_y = 100, 960 - 64
+
+#define colors
+black = (0, 0, 0)
+
+
+class Inputs(namedtuple('Inputs', ['left', 'right', 'jump'])):
+    @classmethod
+    def from_keys(cls, key):
+        return cls(bool(key[pygame.K_LEFT]), bool(key[pygame.K_RIGHT]), bool(key[pygame.K_SPACE]))
+
+NO_INPUT = Inputs(False, False, False)
+
+#what the player's rect overlaps this tick: whether it touches an enemy, spikes or the exit, and the apples it touches
+Contacts = namedtuple('Contacts', ['enemy', 'spikes', 'exit', 'apples'])
+
+
+#function to load the tile grid of a level
+def load_level_data(level):
+    return levelfile.load(levelfile.level_filename(level))
+
+#function to get the tiles of a level as bytes, to tell whether a world was built from them
+def layout_of(data):
+    if isinstance(data, levelfile.Level):
+        return (data.cols, data.rows, data.grid.tobytes())
+    return (len(data[0]), len(data), bytes(tile for row in data for tile in row))
+
+
+class Simulation():
+    def __init__(self, level=STARTING_LEVEL, entity_arrays=False, loader=None, seed=None, swept_platforms=False) -> None:
+        if entity_arrays and EntityArrays is None:
+            raise ImportError('entity_arrays mode requires numpy')
+        self.entity_arrays = entity_arrays
+        #continuous (swept) collision with moving platforms instead of the original threshold checks
+        self.swept_platforms = swept_platforms
+        #optional loader.LevelLoader that reads the next level in the background
+        self.loader = loader
+        #every random choice comes from generators seeded from this, so a seed and the inputs reproduce a run
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        #seed of the current level's enemy idle schedule, derived from the run's seed and the level
+        self.level_seed = None
+        self.player = Player(player_x, player_y, swept_platforms)
+        self.score = 0
+        self.ticks = 0
+        #world rect outside of which enemies, platforms and apples are not updated (None updates everything)
+        self.active_area = None
+        #the player's overlaps found by update_entities, for update_player in the same tick
+        self.contacts = None
+        self.level = None
+        self.world = None
+        self.score_apple = None
+        self.load_level(level)
+
+    def load_level(self, level, data=None, world=None):
+        #data overrides the level file, e.g. for generated maps, and world is an already built level
+        if world is None:
+            if data is None:
+                data = load_level_data(level)
+            if level == self.level and self.world is not None and self.world.has_layout(data):
+                #restarting an unchanged level reuses its world, sprites and baked static layer
+                world = self.world
+                world.respawn()
+        if self.world is not None and self.world is not world:
+            #hand the last level's sprites back to the pool before building the next level from it
+            self.world.release()
+        if world is None:
+            world = World(data)
+        if self.score_apple is not None:
+            self.score_apple.kill()
+            pool.release([self.score_apple])
+        self.level = level
+        self.game_over = 0
+        self.player.reset(player_x, player_y)
+        self.world = world
+        self.level_seed = level_seed(self.seed, level)
+        self.world.schedule_enemies(self.level_seed)
+        if self.entity_arrays:
+            self.world.entities = EntityArrays(self.world)
+
+        #create dummy apple for showing the score
+        self.score_apple = pool.acquire(Apple, tile_size // 2, tile_size // 2)
+        self.world.apple_group.add(self.score_apple)
+
+        #start loading the next level once this one is running, so the worker does not compete with the swap
+        self.prefetch_next = self.loader is not None
+
+    def next_level(self):
+        #move on to the next level, returns False once the last level is completed
+        if self.level >= MAX_LEVEL:
+            return False
+        world = None
+        if self.loader is not None:
+            world = self.loader.take(self.level + 1)
+        self.load_level(self.level + 1, world=world)
+        return True
+
+    def step(self, inputs=NO_INPUT):
+        events = []
+        self.update_entities(events)
+        self.update_player(inputs, events)
+        return events
+
+    def update_entities(self, events):
+        world = self.world
+
+        #player is playing the game
+        if self.game_over == 0:
+            if world.entities is not None:
+                world.entities.update()
+            else:
+                world.update_group(world.enemy_group, self.active_area, world.idle_schedule)
+                world.update_group(world.platform_group, self.active_area)
+            #every overlap check of the player this tick comes from this one broad-phase query
+            self.contacts = world.contacts(self.player.rect)
+            #update score
+            #check if an apple has been collected
+            if self.contacts.apples:
+                world.collect(self.contacts.apples)
+                self.score += 1
+                events.append('apple')
+            #apples and platforms are animated from the ticks they have been updated for
+            world.clock.advance()
+
+    def update_player(self, inputs, events):
+        #movement and every collision check of the player
+        contacts, self.contacts = self.contacts, None
+        self.game_over = self.player.update(self.game_over, self.world, inputs, events, contacts)
+        self.ticks += 1
+
+        if self.prefetch_next:
+            self.prefetch_next = False
+            self.loader.prefetch(self.level + 1)
+
+
+class Player():
+    def __init__(self, x, y, swept_platforms=False) -> None:
+        self.swept_platforms = swept_platforms
+        sprite_sheets = [
+            "img/Pixel Adventure/Main Characters/Pink Man/Idle (32x32).png",
+            "img/Pixel Adventure/Main Characters/Pink Man/Run (32x32).png",
+            "img/Ghost/ghost-Sheet.png",
+        ]
+        #create animation list
+        self.images_right = []
+        self.images_left = []
+        animation_steps = [11, 12, 4]
+        scale = 1
+        width = 32
+        height = 32
+        self.x_offset = 6
+        self.y_offset = 6
+
+        #frame lists are shared through the asset cache and loaded once, resets only put the player back
+        for sheet, animation in zip(sprite_sheets, animation_steps):
+            self.images_right.append(cache.get_frames(sheet, animation, width, height, scale, black))
+            self.images_left.append(cache.get_frames(sheet, animation, width, height, scale, black, flipped=True))
+        self.width = width - (2 * self.x_offset)
+        self.height = height - self.y_offset
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.action = 0
+        self.index = 0
+        self.counter = 0
+        self.image = self.images_right[self.action][self.index]
+        self.rect.update(x + self.x_offset, y + self.y_offset, self.width, self.height)
+        self.vel_y = 0
+        self.jumped = False
+        self.direction = 1
+        self.in_air = True
+        #platform the player landed on last tick, when using swept platform collision
+        self.riding = None
+
+
+    def update(self, game_over, world, inputs, events, contacts=None):
+        dx, dy = 0, 0
+        animation_cooldown = 5
+        col_thresh = 20
+        moved = False
+
+        if game_over == 0:
+            #get keypresses
+            if inputs.jump and not self.jumped and not self.in_air:
+                events.append('jump')
+                self.vel_y = -15
+                self.jumped = True
+                moved = True
+            if not inputs.jump:
+                self.jumped = False
+            if inputs.left:
+                dx -= 5
+                self.direction = -1
+                moved = True
+            if inputs.right:
+                dx += 5
+                self.direction = 1
+                moved = True
+            if moved:
+                if self.action != 1:
+                    self.index = 0
+                    self.counter = 0
+                self.action = 1
+            else:
+                if self.action != 0:
+                    self.index = 0
+                    self.counter = 0
+                self.action = 0
+
+            #add gravity
+            self.vel_y += 1
+            if self.vel_y > 10:
+                self.vel_y = 10
+            dy += self.vel_y
+
+            if self.swept_platforms:
+                #a player standing on a platform moves with it, before the tiles get a say
+                platforms = world.platforms_near(self.rect, dx, dy, tile_size)
+                carry_x, carry_y = self.platform_carry(platforms)
+                dx += carry_x
+                dy += carry_y
+
+            #check for collision against the tiles around the player
+            self.in_air = True
+            for tile in world.tile_grid.query_sweep(self.rect, dx, dy):
+                #check for collision in x direction
+                if tile[1].colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
+                    dx = 0
+
+                #check for collision in y direction
+                if tile[1].colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
+                    #check if below the ground, i.e. jumping into block
+                    if self.vel_y < 0:
+                        dy = tile[1].bottom - self.rect.top
+                        self.vel_y = 0
+                    #check if above the ground, i.e. falling on a block
+                    elif self.vel_y >= 0:
+                        dy = tile[1].top - self.rect.bottom
+                        self.in_air = False
+
+            #enemies, spikes and the exit, from the tick's broad-phase query (the rect has not moved since)
+            if contacts is None:
+                contacts = world.contacts(self.rect)
+
+            #check for collision with enemies
+            if contacts.enemy:
+                game_over = -1
+                events.append('game_over')
+                self.died_y = self.rect.y
+
+            #check for collision with spikes
+            if contacts.spikes:
+                game_over = -1
+                events.append('game_over')
+                self.died_y = self.rect.y
+
+            #check for collision with exit
+            if contacts.exit:
+                game_over = 1
+
+            #check for collision with platforms
+            if self.swept_platforms:
+                dx, dy = self.sweep_platforms(platforms, dx, dy)
+            for platform in () if self.swept_platforms else world.platforms_near(self.rect, dx, dy, col_thresh):
+                #collision in the x direction
+                if platform.rect.colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
+                    dx = 0
+
+                #collision in the y direction
+                if platform.rect.colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
+                    #check if below platform
+                    if abs((self.rect.top + dy) - platform.rect.bottom) < col_thresh:
+                        self.vel_y = 0
+                        dy = platform.rect.bottom - self.rect.top
+                    #check if above platform
+                    elif abs((self.rect.bottom + dy) - platform.rect.top) < col_thresh:
+                        self.rect.bottom = platform.rect.top - 1
+                        self.in_air = False
+                        dy = 0
+                    #move sideways with the platform
+                    if platform.move_x != 0:
+                        self.rect.x += platform.move_direction * platform.move_x
+
+            #update player coordinates
+            self.rect.x += dx
+            self.rect.y += dy
+
+        elif game_over == -1:
+            self.action = 2
+            if self.died_y - self.rect.y < 200:
+                self.rect.y -= 5
+            else:
+                self.counter = 0
+
+        #handle animation
+        self.counter += 1
+        if self.counter > animation_cooldown:
+            self.counter = 0
+            self.index += 1
+            if self.index >= len(self.images_right[self.action]):
+                self.index = 0
+            if self.direction == 1:
+                self.image = self.images_right[self.action][self.index]
+            if self.direction == -1:
+                self.image = self.images_left[self.action][self.index]
+
+        return game_over
+
+    def platform_carry(self, platforms):
+        #how far the platform the player stood on at the end of last tick has moved since, on either axis
+        riding, self.riding = self.riding, None
+        if riding is None or riding not in platforms:
+            return 0, 0
+        vx, vy = riding.velocity()
+        before = riding.rect.move(-vx, -vy)
+        if self.rect.bottom == before.top and self.rect.right > before.left and self.rect.left < before.right:
+            return vx, vy
+        return 0, 0
+
+    def sweep_platforms(self, platforms, dx, dy):
+        #resolve the move against the platforms in order of first contact. Each platform is swept in its own frame
+        #of reference (the player's move minus the platform's), so no contact is missed however far either moves in
+        #a tick, and the player is left flush against the side of the platform that was hit
+        resolved = []
+        while True:
+            first = None
+            for platform in platforms:
+                if platform in resolved:
+                    continue
+                vx, vy = platform.velocity()
+                contact = sweep(self.rect, dx - vx, dy - vy, platform.rect.move(-vx, -vy))
+                if contact is not None and (first is None or contact[0] < first[0]):
+                    first = (contact[0], contact[1], platform, dx - vx, dy - vy)
+            if first is None:
+                return dx, dy
+            _, axis, platform, rel_x, rel_y = first
+            resolved.append(platform)
+            if axis == 'y':
+                #landing on top, or hitting the underside
+                if rel_y > 0 or (rel_y == 0 and self.rect.centery < platform.rect.centery):
+                    dy = platform.rect.top - self.rect.bottom
+                    self.in_air = False
+                    self.riding = platform
+                else:
+                    dy = platform.rect.bottom - self.rect.top
+                    self.vel_y = 0
+            elif rel_x > 0 or (rel_x == 0 and self.rect.centerx < platform.rect.centerx):
+                dx = platform.rect.left - self.rect.right
+            else:
+                dx = platform.rect.right - self.rect.left
+
+    def draw(self, surface, offset=(0, 0)):
+        #draw player onto screen
+        return surface.blit(self.image, (self.rect.x - self.x_offset + offset[0], self.rect.y - self.y_offset + offset[1]))
+        #pygame.draw.rect(surface, (255, 255, 255), self.rect, 2) #see rectangle outline
+
+class World():
+    def __init__(self, data) -> None:
+        self.tile_list = []
+        self.static_layer = None
+        #struct-of-arrays state for enemies and platforms, when enabled
+        self.entities = None
+        #sprites of each group bucketed by the chunk they start in, built on first use
+        self.chunk_size = CHUNK_TILES * tile_size
+        self.chunk_buckets = {}
+        #broad-phase grid of enemies, spikes, exits and apples, built on first use
+        self.contact_grid = None
+        self.platform_grid = None
+        self.tile_grid = TileGrid(len(data[0]), len(data), tile_size)
+        self.enemy_group = pygame.sprite.Group()
+        self.platform_group = pygame.sprite.Group()
+        self.spikes_group = pygame.sprite.Group()
+        self.apple_group = pygame.sprite.Group()
+        self.exit_group = pygame.sprite.Group()
+        #(group, class, arguments) of every entity in the level, and the sprites spawned from them
+        self.spawns = []
+        self.sprites = []
+        #ticks the level has been played for, which the apples' and platforms' frames follow
+        self.clock = AnimationClock()
+        #when each enemy next stops to idle, drawn once the level is started
+        self.idle_schedule = None
+        self.animated = [(self.platform_group, Platform.load_clip()), (self.apple_group, Apple.load_clip())]
+        self.layout = layout_of(data)
+
+        #load images
+        dirt_img = cache.get_image('img/Platform Tiles/dirt_32x32.png', (tile_size, tile_size))
+        grass_img = cache.get_image('img/Platform Tiles/grass_32x32.png', (tile_size, tile_size))
+
+        for row_count, row in enumerate(data):
+            for col_count, tile in enumerate(row):
+                x, y = col_count * tile_size, row_count * tile_size
+                if tile == 1:
+                    img = dirt_img
+                    img_rect = img.get_rect()
+                    img_rect.x = x
+                    img_rect.y = y
+                    tile = (img, img_rect)
+                    self.tile_list.append(tile)
+                    self.tile_grid.add(col_count, row_count, tile)
+                if tile == 2:
+                    img = grass_img
+                    img_rect = img.get_rect()
+                    img_rect.x = x
+                    img_rect.y = y
+                    tile = (img, img_rect)
+                    self.tile_list.append(tile)
+                    self.tile_grid.add(col_count, row_count, tile)
+                if tile == 3:
+                    self.spawns.append((self.enemy_group, Enemy, (x, y)))
+                if tile == 4:
+                    self.spawns.append((self.platform_group, Platform, (x, y, 1, 0)))
+                if tile == 5:
+                    self.spawns.append((self.platform_group, Platform, (x, y, 0, 1)))
+                if tile == 6:
+                    self.spawns.append((self.spikes_group, Spikes, (col_count * tile_size, row_count * tile_size + (tile_size // 2))))
+                if tile == 7:
+                    self.spawns.append((self.apple_group, Apple, (col_count * tile_size + (tile_size // 2), row_count * tile_size + (tile_size // 2))))
+                if tile == 8:
+                    self.spawns.append((self.exit_group, Exit, (x, y)))
+        self.spawn()
+
+    def spawn(self):
+        #place every entity where the level starts it, reusing pooled sprites
+        for group, cls, args in self.spawns:
+            sprite = pool.acquire(cls, *args)
+            group.add(sprite)
+            self.sprites.append(sprite)
+
+    def release(self):
+        #take every entity out of its groups and hand it back to the pool
+        for sprite in self.sprites:
+            sprite.kill()
+        pool.release(self.sprites)
+        self.sprites = []
+
+    def respawn(self):
+        #restart the level in place: the entities start over on the same sprites, and the tiles and static layer are kept
+        self.release()
+        self.entities = None
+        self.clock.reset()
+        self.chunk_buckets = {}
+        self.contact_grid = None
+        self.platform_grid = None
+        self.spawn()
+
+    def schedule_enemies(self, seed):
+        #give every enemy its first idle from a new schedule, so the level plays out the same for the same seed
+        self.idle_schedule = IdleSchedule(seed)
+        for enemy in self.enemy_group:
+            enemy.moves_left, enemy.next_idle = self.idle_schedule.next()
+
+    def has_layout(self, data):
+        return self.layout == layout_of(data)
+
+    def build_contact_grid(self):
+        #spikes, exits and apples never move, and enemies are listed over the whole stretch they patrol
+        grid = SpatialGrid(CONTACT_TILES * tile_size)
+        if self.entities is None:
+            for enemy in self.enemy_group:
+                grid.insert(('enemy', enemy), enemy.rect.inflate(2 * Enemy.reach, 0))
+        for kind, group in (('spikes', self.spikes_group), ('exit', self.exit_group), ('apple', self.apple_group)):
+            for sprite in group:
+                grid.insert((kind, sprite), sprite.rect.copy())
+        self.contact_grid = grid
+
+    def contacts(self, rect):
+        #everything the rect overlaps, from one query of the broad-phase grid
+        if self.contact_grid is None:
+            self.build_contact_grid()
+        enemy = spikes = exit = False
+        apples = []
+        for kind, sprite in self.contact_grid.query(rect):
+            if not sprite.rect.colliderect(rect):
+                continue
+            if kind == 'enemy':
+                enemy = True
+            elif kind == 'spikes':
+                spikes = True
+            elif kind == 'exit':
+                exit = True
+            elif sprite.alive():
+                apples.append(sprite)
+        if self.entities is not None:
+            enemy = self.entities.enemy_hit(rect)
+        return Contacts(enemy, spikes, exit, apples)
+
+    def collect(self, apples):
+        for apple in apples:
+            apple.kill()
+            self.contact_grid.remove(('apple', apple), apple.rect)
+
+    def platforms_near(self, rect, dx, dy, col_thresh):
+        if self.entities is None:
+            #platforms listed over the stretch they move along, in group order
+            if self.platform_grid is None:
+                self.platform_grid = SpatialGrid(CONTACT_TILES * tile_size)
+                for order, platform in enumerate(self.platform_group):
+                    reach = Platform.reach
+                    self.platform_grid.insert((order, platform), platform.rect.inflate(2 * reach * platform.move_x, 2 * reach * platform.move_y))
+            x = min(rect.x, rect.x + dx) - col_thresh
+            y = min(rect.y, rect.y + dy) - col_thresh
+            area = pygame.Rect(x, y, rect.width + abs(dx) + 2 * col_thresh, rect.height + abs(dy) + 2 * col_thresh)
+            return [platform for _, platform in sorted(self.platform_grid.query(area), key=lambda item: item[0])]
+        #the player can be moved by up to col_thresh while resolving each platform, so pad the sweep by that much
+        x = min(rect.x, rect.x + dx) - col_thresh
+        y = min(rect.y, rect.y + dy) - col_thresh
+        return self.entities.platforms_near(x, y, rect.width + abs(dx) + 2 * col_thresh, rect.height + abs(dy) + 2 * col_thresh)
+
+    def sprites_in_area(self, group, area):
+        #live sprites that started within a chunk of the area, which moving sprites never leave
+        buckets = self.chunk_buckets.get(id(group))
+        if buckets is None:
+            buckets = {}
+            for sprite in group:
+                buckets.setdefault((sprite.rect.x // self.chunk_size, sprite.rect.y // self.chunk_size), []).append(sprite)
+            self.chunk_buckets[id(group)] = buckets
+        sprites = []
+        for row in range(area.top // self.chunk_size - 1, (area.bottom - 1) // self.chunk_size + 2):
+            for col in range(area.left // self.chunk_size - 1, (area.right - 1) // self.chunk_size + 2):
+                for sprite in buckets.get((col, row), ()):
+                    if sprite.alive():
+                        sprites.append(sprite)
+        return sprites
+
+    def update_group(self, group, area=None, *args):
+        if area is None:
+            group.update(*args)
+            return
+        for sprite in self.sprites_in_area(group, area):
+            sprite.update(*args)
+
+    def sync_sprites(self):
+        #bring the sprites up to date before drawing
+        if self.entities is not None:
+            self.entities.sync()
+        for group, clip in self.animated:
+            self.clock.animate(group, clip)
+
+    def sprite_groups(self):
+        #groups in the order they are drawn
+        return [self.enemy_group, self.platform_group, self.spikes_group, self.apple_group, self.exit_group]
+
+    def bake(self, background):
+        #composite the background and every tile into one surface, so drawing the level is a single blit
+        self.static_layer = background.copy()
+        self.static_layer.blits([(tile[0], tile[1]) for tile in self.tile_list], False)
+
+    def draw(self, surface):
+        if self.static_layer is not None:
+            surface.blit(self.static_layer, (0, 0))
+            return
+        surface.blits([(tile[0], tile[1]) for tile in self.tile_list], False)
+        #for tile in self.tile_list: pygame.draw.rect(surface, (255, 255, 255), tile[1], 2) #see rectangle outline
+
+
+class Enemy(pygame.sprite.DirtySprite):
+    #furthest an enemy gets from where it starts, as it turns around once it is more than 50px away
+    reach = 51
+
+    def __init__(self, x, y) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        sprite_sheets = [
+            "img/Pixel Adventure/Enemies/Rocks/Rock2_Idle (32x28).png",
+            "img/Pixel Adventure/Enemies/Rocks/Rock2_Run (32x28).png",
+        ]
+        #create animation list
+        self.images_right = []
+        self.images_left = []
+        animation_steps = [13, 14]
+        scale = 1
+        width = 32
+        height = 32
+        self.x_offset = 0
+        self.y_offset = 10
+
+        for sheet, animation in zip(sprite_sheets, animation_steps):
+            self.images_right.append(cache.get_frames(sheet, animation, width, height, scale, black))
+            self.images_left.append(cache.get_frames(sheet, animation, width, height, scale, black, flipped=True))
+        self.rect = self.images_right[1][0].get_rect()
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        #back to the state of a new enemy at (x, y), so a pooled one can be reused
+        self.action = 1
+        self.index = 0
+        self.counter = 0
+        self.idle_time = 0
+        #moving ticks until the next idle and how long it lasts, once the level has scheduled its enemies
+        self.moves_left = 0
+        self.next_idle = 0
+        self.image = self.images_right[self.action][self.index]
+        self.rect.topleft = (x, y)
+        self.move_direction = 1
+        self.move_counter = 0
+        #moving and animated, so always redrawn in dirty-rect mode
+        self.dirty = 2
+
+    def update(self, schedule):
+        if self.idle_time > 0:
+            self.action = 0
+            self.idle_time -= 1
+        else:
+            self.action = 1
+            self.rect.x += self.move_direction
+            self.move_counter += 1
+            self.moves_left -= 1
+            if self.moves_left == 0:
+                self.idle_time = self.next_idle
+                self.moves_left, self.next_idle = schedule.next()
+        #handle animation
+        animation_cooldown = 5
+        self.counter += 1
+        if self.counter > animation_cooldown:
+            self.counter = 0
+            self.index += 1
+            if self.index >= len(self.images_right[self.action]):
+                self.index = 0
+            if self.move_direction == -1:
+                self.image = self.images_right[self.action][self.index]
+            if self.move_direction == 1:
+                self.image = self.images_left[self.action][self.index]
+        if abs(self.move_counter) > 50:
+            self.move_direction *= -1
+            self.move_counter *= -1
+        #pygame.draw.rect(screen, (255, 255, 255), self.rect, 2) #see rectangle outline
+
+class Platform(pygame.sprite.DirtySprite):
+    #furthest a platform gets from where it starts along its axis, in steps of move_x or move_y
+    reach = 51
+
+    def __init__(self, x, y, move_x, move_y) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        self.clip = self.load_clip()
+        self.rect = self.clip.frames[0].get_rect()
+        self.reset(x, y, move_x, move_y)
+
+    @staticmethod
+    def load_clip():
+        #every platform shows the same animation in step, so the world animates them together
+        animation_steps = 4
+        scale = 1
+        width = 32
+        height = 10
+        return cache.get_clip("img/Pixel Adventure/Traps/Falling Platforms/On (32x10).png", animation_steps, width, height, scale, black)
+
+    def reset(self, x, y, move_x, move_y):
+        self.image = self.clip.frames[0]
+        self.rect.topleft = (x, y)
+        self.move_direction = 1
+        self.move_counter = 0
+        self.move_x = move_x
+        self.move_y = move_y
+        self.dirty = 2
+
+    def update(self):
+        self.rect.x += self.move_direction * self.move_x
+        self.rect.y += self.move_direction * self.move_y
+        self.move_counter += 1
+        if abs(self.move_counter) > 50:
+            self.move_direction *= -1
+            self.move_counter *= -1
+
+    def velocity(self):
+        #how far the last update moved the platform, which turns around after moving once it is past its reach
+        direction = -self.move_direction if self.move_counter == -self.reach else self.move_direction
+        return direction * self.move_x, direction * self.move_y
+
+class Spikes(pygame.sprite.DirtySprite):
+    def __init__(self, x, y) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        self.image = cache.get_image("img/Pixel Adventure/Traps/Spikes/Idle.png", (tile_size, tile_size // 2))
+        self.rect = self.image.get_rect()
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.rect.topleft = (x, y)
+        #drawn once, as a new sprite is
+        self.dirty = 1
+
+class Apple(pygame.sprite.DirtySprite):
+    def __init__(self, x, y) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        self.clip = self.load_clip()
+        self.rect = self.clip.frames[0].get_rect()
+        self.reset(x, y)
+
+    @staticmethod
+    def load_clip():
+        #apples are all animated in step by the world's clock, so they have no update of their own
+        animation_steps = 17
+        scale = 1
+        width = 32
+        height = 32
+        return cache.get_clip("img/Pixel Adventure/Items/Fruits/Apple.png", animation_steps, width, height, scale, black)
+
+    def reset(self, x, y):
+        self.image = self.clip.frames[0]
+        self.rect.center = (x, y)
+        self.dirty = 2
+
+class Exit(pygame.sprite.DirtySprite):
+    def __init__(self, x, y) -> None:
+        pygame.sprite.DirtySprite.__init__(self)
+        self.image = cache.get_image("img/Pixel Adventure/Items/Checkpoints/End/End (Idle).png", (tile_size, tile_size))
+        self.rect = self.image.get_rect()
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.rect.topleft = (x, y)
+        self.dirty = 1
+
+
+def main():
+    import os
+    import sys
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    #run every level headless with no input and report the tick rate
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    for level in range(STARTING_LEVEL, MAX_LEVEL + 1):
+        sim = Simulation(level)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            sim.step()
+        elapsed = time.perf_counter() - start
+        print(f'level {level:>2}: {ticks} ticks in {elapsed:.3f} s ({ticks / elapsed:,.0f} ticks/s), game_over={sim.game_over}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,98 @@
 import pygame
 
+class TextureAtlas():
+    #packs frames into a few large page surfaces and hands out subsurfaces of them, which share the page's pixels
+    def __init__(self, page_size=512) -> None:
+        self.page_size = page_size
+        self.pages = []
+        self.frames = 0
+        self.used_area = 0
+        self.shelf_x = self.shelf_y = self.shelf_height = 0
+
+    def new_page(self, width, height):
+        #same format as frames made without an atlas
+        page = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            page = page.convert_alpha()
+        self.pages.append(page)
+        return page
+
+    def allocate(self, width, height):
+        #shelf packing: fill rows left to right, start a new row or page when out of room
+        self.frames += 1
+        self.used_area += width * height
+        if width > self.page_size or height > self.page_size:
+            return self.new_page(width, height)
+        if self.pages and self.shelf_x + width > self.page_size:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height
+            self.shelf_height = 0
+        if not self.pages or self.shelf_y + height > self.page_size:
+            self.new_page(self.page_size, self.page_size)
+            self.shelf_x = self.shelf_y = self.shelf_height = 0
+        region = self.pages[-1].subsurface((self.shelf_x, self.shelf_y, width, height))
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return region
+
+    def adopt(self, pages, frames, used_area):
+        #take pages packed elsewhere (e.g. loaded from a bundle), new frames go on a fresh page after them
+        self.pages.extend(pages)
+        self.frames += frames
+        self.used_area += used_area
+        self.shelf_x = self.shelf_height = 0
+        self.shelf_y = self.page_size
+
+    def resident_bytes(self):
+        return sum(page.get_pitch() * page.get_height() for page in self.pages)
+
+    def stats(self):
+        page_area = sum(page.get_width() * page.get_height() for page in self.pages)
+        return {
+            'pages': len(self.pages),
+            'frames': self.frames,
+            'resident_bytes': self.resident_bytes(),
+            'fill': self.used_area / page_area if page_area else 0.0,
+        }
+
 class SpriteSheet():
     def __init__(self, image) -> None:
         self.sheet = image
 
-    def get_image(self, frame, width, height, scale, color):
-        image = pygame.Surface((width, height)).convert_alpha()
-        image.blit(self.sheet, (0, 0), ((frame * width), 0, width, height))
-        image = pygame.transform.scale(image, (width * scale, height * scale))
+    def get_image(self, frame, width, height, scale, color, atlas=None):
+        area = ((frame * width), 0, width, height)
+        if atlas is not None:
+            #draw straight into the atlas, with no intermediate copy unless the frame is scaled
+            image = atlas.allocate(width * scale, height * scale)
+            if scale == 1:
+                image.fill((0, 0, 0, 255))
+                image.blit(self.sheet, (0, 0), area)
+            else:
+                unscaled = self.get_image(frame, width, height, 1, color)
+                pygame.transform.scale(unscaled, (width * scale, height * scale), image)
+            image.set_colorkey(color)
+            return image
+        image = pygame.Surface((width, height))
+        #conversion needs a display, which headless simulations do not have
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        image.blit(self.sheet, (0, 0), area)
+        if scale != 1:
+            image = pygame.transform.scale(image, (width * scale, height * scale))
         image.set_colorkey(color)
-        
+
         return image
-    
+
     @staticmethod
-    def get_x_flipped_image(img, color):
+    def get_x_flipped_image(img, color, atlas=None):
         image = img
         image = pygame.transform.flip(img, True, False)
+        if atlas is not None:
+            #frames are opaque apart from the colorkey, so blitting the mirrored copy into the atlas copies it exactly
+            flipped = image
+            flipped.set_colorkey(None)
+            image = atlas.allocate(*flipped.get_size())
+            image.blit(flipped, (0, 0))
         image.set_colorkey(color)
 
-        return image
\ No newline at end of file
+        return image
@@ -0,0 +1,75 @@
+"""
+text.py: Cached text rendering for the HUD.
+TextCache keeps rendered strings in a bounded LRU keyed by font, string and
+colour, so text that rarely changes (level counter, GAME OVER) is rasterized
+once instead of every frame. GlyphAtlas renders a font's glyphs into one
+surface up front and draws strings as a batch of blits from it, which suits
+counters whose value keeps changing.
+"""
+
+from collections import OrderedDict
+import pygame
+
+
+class TextCache():
+    def __init__(self, size=64, antialias=True) -> None:
+        self.size = size
+        self.antialias = antialias
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        image = self.entries.get(key)
+        if image is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return image
+        self.misses += 1
+        image = font.render(text, self.antialias, color)
+        self.entries[key] = image
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return image
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        self.entries.clear()
+
+
+class GlyphAtlas():
+    def __init__(self, font, color, chars='0123456789', antialias=True) -> None:
+        #every glyph side by side in one surface, with the source rect and advance of each
+        glyphs = [(char, font.render(char, antialias, color)) for char in dict.fromkeys(chars)]
+        self.advances = {char: metrics[4] for char, metrics in zip(dict.fromkeys(chars), font.metrics(''.join(dict.fromkeys(chars))))}
+        width = sum(image.get_width() for _, image in glyphs)
+        self.height = max(image.get_height() for _, image in glyphs)
+        self.image = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        self.rects = {}
+        x = 0
+        for char, image in glyphs:
+            self.image.blit(image, (x, 0))
+            self.rects[char] = pygame.Rect(x, 0, image.get_width(), image.get_height())
+            x += image.get_width()
+        if pygame.display.get_surface() is not None:
+            self.image = self.image.convert_alpha()
+
+    def size(self, text):
+        return sum(self.advances[char] for char in text), self.height
+
+    def draw(self, surface, text, x, y):
+        #characters that are not in the atlas are skipped
+        start = x
+        right = x
+        blits = []
+        for char in text:
+            rect = self.rects.get(char)
+            if rect is not None:
+                blits.append((self.image, (x, y), rect))
+                right = max(right, x + rect.width)
+                x += self.advances[char]
+        surface.blits(blits, False)
+        return pygame.Rect(start, y, right - start, self.height)
@@ -0,0 +1,23 @@
+"""
+conftest.py: Shared setup for the tests.
+The game's modules import each other by name, as they do when run from
+Platformer/, pygame runs headless on SDL's dummy drivers, and every test runs
+from the repository root like the game does.
+"""
+
+import os
+import sys
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+#repository root, where the level files and images are looked up from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Platformer'))
+
+
+@pytest.fixture(autouse=True)
+def repository_root(monkeypatch):
+    #images and level files are found relative to the repository root
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,39 @@
+"""
+test_entity_arrays.py: The struct-of-arrays update draws the same frames as
+the sprites' own update.
+"""
+
+import pygame
+import pytest
+from simulation import Simulation, NO_INPUT, MAX_LEVEL
+
+pytest.importorskip('numpy')
+
+#ticks each level is played for, and how often the whole screen is compared
+TICKS = 600
+RENDER_EVERY = 20
+
+
+def render(world, surface):
+    surface.fill((0, 0, 0))
+    world.draw(surface)
+    for group in world.sprite_groups():
+        group.draw(surface)
+    return pygame.image.tobytes(surface, 'RGB')
+
+
+@pytest.mark.parametrize('level', range(1, MAX_LEVEL + 1))
+def test_arrays_draw_like_sprites(level):
+    sprites = Simulation(level, seed=level)
+    arrays = Simulation(level, entity_arrays=True, seed=level)
+    surface = pygame.Surface((960, 960))
+    for tick in range(TICKS):
+        sprites.step(NO_INPUT)
+        arrays.step(NO_INPUT)
+        sprites.world.sync_sprites()
+        arrays.world.sync_sprites()
+        for sprite, array in zip(sprites.world.enemy_group, arrays.world.enemy_group):
+            assert sprite.rect == array.rect, f'tick {tick}'
+            assert sprite.image is array.image, f'tick {tick}'
+        if tick % RENDER_EVERY == 0:
+            assert render(sprites.world, surface) == render(arrays.world, surface), f'tick {tick}'
@@ -0,0 +1,25 @@
+"""
+test_levelcheck.py: Every shipped level can be finished with every apple.
+"""
+
+import os
+from glob import glob
+import pytest
+import levelcheck
+from conftest import ROOT
+
+
+LEVELS = sorted(glob(os.path.join(ROOT, 'level*.lvl')), key=lambda name: int(os.path.basename(name)[5:-4]))
+
+
+def test_levels_found():
+    assert LEVELS
+
+
+@pytest.mark.parametrize('filename', LEVELS, ids=os.path.basename)
+def test_level_solvable(filename):
+    #with the default search settings, as the command line runs it
+    result = levelcheck.check_level(filename)
+    assert not result['inconclusive']
+    assert result['exit_ticks'] is not None
+    assert result['unreachable_apples'] == []